@@ -15,10 +15,11 @@ if __name__ == "__main__":
         open(path.join(REPLAY_DIR, "team1.wowsreplay"), "rb") as gt,
         open(path.join(REPLAY_DIR, "team2.wowsreplay"), "rb") as rt,
     ):
-        g_replay_info = ReplayParser(gt, True).get_info()
+        channels = RenderDual.get_channels()
+        g_replay_info = ReplayParser(gt, True, channels=channels).get_info()
         g_replay_data: ReplayData = g_replay_info["hidden"]["replay_data"]
 
-        r_replay_info = ReplayParser(rt, True).get_info()
+        r_replay_info = ReplayParser(rt, True, channels=channels).get_info()
         r_replay_data: ReplayData = r_replay_info["hidden"]["replay_data"]
 
         RenderDual(
@@ -15,19 +15,24 @@ if __name__ == "__main__":
     video_path = path.parent.joinpath(f"{path.stem}.mp4")
     with open(namespace.replay, "rb") as f:
         LOGGER.info("Parsing the replay file...")
-        replay_info = ReplayParser(
-            f, strict=True, raw_data_output=False
-        ).get_info()
-        LOGGER.info(f"Replay has version {replay_info['open']['clientVersionFromExe']}")
+        # replay is parsed while it is rendered
+        replay_data = ReplayParser(
+            f,
+            strict=True,
+            raw_data_output=False,
+            channels=Renderer.get_channels(logs=True, enable_chat=True),
+        ).stream()
+        LOGGER.info(f"Replay has version {replay_data.game_version}")
         LOGGER.info("Rendering the replay file...")
         renderer = Renderer(
-            replay_info["hidden"]["replay_data"],
+            replay_data,
             logs=True,
             enable_chat=True,
             use_tqdm=True,
         )
+        renderer.start(str(video_path))
+        # builds are complete once streamed replay is rendered
         with open(path.parent.joinpath(f"{path.stem}-builds.json"), "w") as fp:
             json.dump(renderer.get_player_build(), fp, indent=4)
-        renderer.start(str(video_path))
         LOGGER.info(f"The video file is at: {str(video_path)}")
         LOGGER.info("Done.")
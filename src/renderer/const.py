@@ -190,3 +190,23 @@ LAYERS = [
     "LayerBuilding",
     "LayerMarkers",
 ]
+
+# channels of events each layer reads
+LAYER_CHANNELS = {
+    "LayerShip": ("evt_vehicle",),
+    "LayerShot": ("evt_shot",),
+    "LayerTorpedo": ("evt_torpedo", "evt_hits", "evt_acoustic_torpedo"),
+    "LayerSmoke": ("evt_smoke",),
+    "LayerPlane": ("evt_plane",),
+    "LayerWard": ("evt_ward",),
+    "LayerCapture": ("evt_control",),
+    "LayerHealth": ("evt_vehicle",),
+    "LayerScore": ("evt_score", "evt_times_to_win"),
+    "LayerCounter": ("evt_damage_maps",),
+    "LayerFrag": ("evt_frag",),
+    "LayerTimer": (),
+    "LayerRibbon": ("evt_ribbon", "evt_achievement"),
+    "LayerChat": ("evt_chat",),
+    "LayerBuilding": ("evt_building",),
+    "LayerMarkers": ("evt_vehicle",),
+}
@@ -1,4 +1,11 @@
-from typing import NamedTuple, Optional
+import copy
+import queue
+import threading
+from collections.abc import Mapping
+from operator import attrgetter, ne
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+import numpy as np
 
 
 class Units(NamedTuple):
@@ -244,6 +251,438 @@ class Events(NamedTuple):
     last_frame: bool = False
 
 
+# parts of events which can be turned off while parsing
+EVENT_CHANNELS = tuple(
+    name for name in Events._fields if name.startswith("evt_")
+)
+
+
+_MISSING = object()
+
+
+class _Patch(NamedTuple):
+    """Changed and removed keys of dict."""
+
+    changed: dict
+    removed: tuple
+
+
+def _copy_dict(value: dict, depth: int) -> dict:
+    if depth:
+        return {
+            key: _copy_dict(item, depth - 1)
+            if item.__class__ is dict
+            else copy.deepcopy(item)
+            for key, item in value.items()
+        }
+    return dict(value)
+
+
+def _diff_dict(mirror: dict, live: dict, depth: int):
+    """
+    Update mirror to be equal to live dict and return difference,
+    None if nothing changed, new dict if it has to be replaced or _Patch;
+    Nested dicts are compared up to given depth, deeper values are copied.
+    """
+    changed = {}
+    for key, value in live.items():
+        old = mirror.get(key, _MISSING)
+        if old is value:
+            continue
+        if depth and old.__class__ is dict and value.__class__ is dict:
+            diff = _diff_dict(old, value, depth - 1)
+            if diff is not None:
+                changed[key] = diff
+        elif old.__class__ is not value.__class__ or old != value:
+            if not depth:
+                mirror[key] = changed[key] = value
+            elif value.__class__ is dict:
+                # mirror is changed in place, so change needs own copy
+                mirror[key] = _copy_dict(value, depth - 1)
+                changed[key] = _copy_dict(value, depth - 1)
+            else:
+                mirror[key] = changed[key] = copy.deepcopy(value)
+
+    removed = ()
+    if len(mirror) != len(live):
+        removed = tuple(key for key in mirror if key not in live)
+        for key in removed:
+            del mirror[key]
+
+    # keys removed and added back are moved to the end of dict
+    if any(map(ne, mirror, live)):
+        mirror.clear()
+        mirror.update(_copy_dict(live, depth))
+        return _copy_dict(mirror, depth)
+
+    if changed or removed:
+        return _Patch(changed, removed)
+    return None
+
+
+def _apply_diff(target: dict, diff, depth: int) -> dict:
+    if diff.__class__ is dict:
+        return _copy_dict(diff, depth)
+    for key in diff.removed:
+        del target[key]
+    for key, value in diff.changed.items():
+        if value.__class__ is _Patch:
+            _apply_diff(target[key], value, depth - 1)
+        elif value.__class__ is dict:
+            target[key] = _copy_dict(value, depth - 1)
+        else:
+            target[key] = value
+    return target
+
+
+class EventTimeline(Mapping):
+    """
+    Events of match by battle time.
+
+    Only changes of state between recorded events are stored,
+    with full state every KEYFRAME_INTERVAL events;
+    Events are materialized on access, so getting events of
+    consecutive battle times costs as much as one change.
+    """
+
+    KEYFRAME_INTERVAL = 64
+
+    # dicts describing state of match, with depth of nested dicts
+    STATE_FIELDS = {
+        "evt_vehicle": 0,
+        "evt_building": 0,
+        "evt_plane": 0,
+        "evt_ward": 0,
+        "evt_smoke": 0,
+        "evt_control": 0,
+        "evt_score": 0,
+        "evt_damage_maps": 1,
+        "evt_ribbon": 1,
+        "evt_achievement": 1,
+    }
+    # values accumulated between events, with their types
+    ACCUMULATED_FIELDS = {
+        "evt_shot": list,
+        "evt_torpedo": dict,
+        "evt_hits": list,
+        "evt_consumable": dict,
+        "evt_frag": list,
+        "evt_chat": list,
+        "evt_acoustic_torpedo": dict,
+    }
+
+    def __init__(self, channels: Optional[Iterable[str]] = None):
+        """
+        Only given channels of events are recorded (all by default),
+        others are always empty
+        """
+        self.channels = frozenset(
+            EVENT_CHANNELS if channels is None else channels
+        )
+        unknown = self.channels.difference(EVENT_CHANNELS)
+        if unknown:
+            raise ValueError(
+                "Unknown channels of events: %s" % ", ".join(sorted(unknown))
+            )
+        self._state_fields = {
+            name: depth
+            for name, depth in self.STATE_FIELDS.items()
+            if name in self.channels
+        }
+
+        # battle time -> index of recorded events
+        self._index: dict[int, int] = {}
+        # state diffs (or full state for keyframes) and other values
+        self._frames: list[tuple[tuple, dict]] = []
+        self._mirror = {name: {} for name in self._state_fields}
+        self._cache: Optional[tuple[int, Events]] = None
+        self._last_time: Optional[int] = None
+
+        # called with (battle_time, events) as soon as events
+        # of battle time are complete, i.e. events of other battle time
+        # are recorded or they are events of last frame
+        self.listener: Optional[Callable[[int, Events], None]] = None
+
+    def record(self, battle_time: int, events: Events):
+        """
+        Record events at given battle time;
+        Given dicts are not stored and may be changed afterwards.
+        """
+        last_time = self._last_time
+        if (
+            self.listener is not None
+            and last_time is not None
+            and last_time != battle_time
+        ):
+            self.listener(last_time, self[last_time])
+        self._last_time = battle_time
+
+        position = len(self._frames)
+        is_keyframe = position % self.KEYFRAME_INTERVAL == 0
+
+        state = []
+        for name, depth in self._state_fields.items():
+            mirror = self._mirror[name]
+            diff = _diff_dict(mirror, getattr(events, name), depth)
+            if is_keyframe:
+                diff = _copy_dict(mirror, depth)
+            state.append(diff)
+
+        values = {}
+        for name, value in zip(events._fields, events):
+            if name in self.STATE_FIELDS:
+                continue
+            if name.startswith("evt_") and name not in self.channels:
+                continue
+            if name in self.ACCUMULATED_FIELDS:
+                if not value:
+                    continue
+                value = copy.copy(value)
+            values[name] = value
+
+        self._frames.append((tuple(state), values))
+        self._index[battle_time] = position
+
+        if self.listener is not None and events.last_frame:
+            self.listener(battle_time, self[battle_time])
+
+    def _materialize(self, position: int) -> Events:
+        start = position - position % self.KEYFRAME_INTERVAL
+        if self._cache is not None and start < self._cache[0] <= position:
+            start, events = self._cache
+            state = [
+                _copy_dict(getattr(events, name), depth)
+                for name, depth in self._state_fields.items()
+            ]
+            start += 1
+        else:
+            state = [{} for _ in self._state_fields]
+
+        depths = tuple(self._state_fields.values())
+        for frame_state, _ in self._frames[start:position + 1]:
+            for i, diff in enumerate(frame_state):
+                if diff is not None:
+                    state[i] = _apply_diff(state[i], diff, depths[i])
+
+        values = {name: {} for name in self.STATE_FIELDS}
+        values.update(zip(self._state_fields, state))
+        for name, factory in self.ACCUMULATED_FIELDS.items():
+            values[name] = factory()
+        values["evt_times_to_win"] = None
+        frame_values = self._frames[position][1]
+        for name, value in frame_values.items():
+            values[name] = (
+                copy.copy(value) if name in self.ACCUMULATED_FIELDS else value
+            )
+        return Events(**values)
+
+    def __getitem__(self, battle_time: int) -> Events:
+        position = self._index[battle_time]
+        if self._cache is None or self._cache[0] != position:
+            self._cache = position, self._materialize(position)
+        return self._cache[1]
+
+    def __contains__(self, battle_time) -> bool:
+        return battle_time in self._index
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_cache"] = None
+        state["listener"] = None
+        return state
+
+
+class VehicleTracks:
+    """
+    Vehicle states of match as (n_ticks, n_vehicles) arrays,
+    recorded along with events;
+    Row of battle time is given by get_row, column of vehicle by columns,
+    cells of vehicles which did not exist yet are zeros.
+    """
+
+    FIELDS = {
+        "x": np.int16,
+        "y": np.int16,
+        "yaw": np.int16,
+        "health": np.float32,
+        "is_alive": np.bool_,
+        "is_visible": np.bool_,
+        "visibility_flag": np.int32,
+        "burn_flags": np.int32,
+    }
+
+    _get_values = attrgetter(*FIELDS)
+
+    def __init__(self):
+        # vehicle id -> column
+        self.columns: dict[int, int] = {}
+        # battle time -> row
+        self._rows: dict[int, int] = {}
+        # values of all fields, grown while recording
+        self._buffer = np.zeros((64, 24, len(self.FIELDS)))
+        self._arrays: Optional[dict[str, np.ndarray]] = None
+
+    def record(self, battle_time: int, vehicles: dict[int, Vehicle]):
+        row = self._rows.setdefault(battle_time, len(self._rows))
+        columns = [
+            self.columns.setdefault(vehicle_id, len(self.columns))
+            for vehicle_id in vehicles
+        ]
+        self._reserve(len(self._rows), len(self.columns))
+        self._buffer[row] = 0
+        if columns:
+            self._buffer[row, columns] = list(
+                map(self._get_values, vehicles.values())
+            )
+        self._arrays = None
+
+    def _reserve(self, rows: int, columns: int):
+        height, width, depth = self._buffer.shape
+        if rows <= height and columns <= width:
+            return
+        # both dimensions are doubled, so growing is amortized
+        # even when vehicles keep joining, e.g. bots of scenarios
+        buffer = np.zeros(
+            (
+                height if rows <= height else max(rows, height * 2),
+                width if columns <= width else max(columns, width * 2),
+                depth,
+            )
+        )
+        buffer[:height, :width] = self._buffer
+        self._buffer = buffer
+
+    def _get_arrays(self) -> dict[str, np.ndarray]:
+        if self._arrays is None:
+            values = self._buffer[: len(self._rows), : len(self.columns)]
+            self._arrays = {
+                name: values[:, :, i].astype(dtype)
+                for i, (name, dtype) in enumerate(self.FIELDS.items())
+            }
+        return self._arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Values of field for all ticks and vehicles."""
+        return self._get_arrays()[name]
+
+    @property
+    def times(self) -> np.ndarray:
+        """Battle time of every row."""
+        return np.fromiter(self._rows, dtype=np.int32, count=len(self._rows))
+
+    def get_row(self, battle_time: int) -> int:
+        return self._rows[battle_time]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_buffer"] = self._buffer[: len(self._rows), : len(self.columns)]
+        state["_arrays"] = None
+        return state
+
+
+class EventFeed:
+    """
+    Producing side of EventStream, held by parser instead of stream
+    itself, so stream is closed as soon as consumer drops it.
+    """
+
+    # seconds to wait for room in queue before checking if stream is closed
+    PUT_TIMEOUT = 0.5
+
+    def __init__(self, maxsize: int):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.closed = threading.Event()
+
+        # replay data with final result of battle,
+        # set by parser before events of last frame are put
+        self.result: Optional["ReplayData"] = None
+
+    def put(self, battle_time: Optional[int], events) -> bool:
+        """
+        Put events, waiting for room in queue;
+        Returns False if stream was closed, so parser has to stop
+        """
+        while not self.closed.is_set():
+            try:
+                self.queue.put((battle_time, events), timeout=self.PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def finish(self, error: Optional[BaseException] = None):
+        """
+        End stream, error is raised by iteration if given
+        """
+        self.put(None, error)
+
+
+class EventStream(Mapping):
+    """
+    Events of match streamed by parser running in another thread.
+
+    Iteration yields battle times as soon as their events are put,
+    only events of battle time reached by iteration can be got;
+    Queue is bounded, so parser waits when it is maxsize
+    battle times ahead of consumer, and stops once stream is closed.
+    """
+
+    MAXSIZE = 64
+
+    def __init__(self, maxsize: int = MAXSIZE):
+        self.feed = EventFeed(maxsize)
+        self._current: Optional[tuple[int, Events]] = None
+        self._count = 0
+        self._is_finished = False
+
+    @property
+    def result(self) -> Optional["ReplayData"]:
+        return self.feed.result
+
+    def close(self):
+        """
+        Stop streaming, parser stops at next put
+        """
+        self._is_finished = True
+        self.feed.closed.set()
+
+    def __del__(self):
+        self.close()
+
+    def __iter__(self) -> Iterator[int]:
+        while not self._is_finished:
+            battle_time, events = self.feed.queue.get()
+            if battle_time is None:
+                self._is_finished = True
+                if events is not None:
+                    raise events
+                return
+            self._current = battle_time, events
+            self._count += 1
+            yield battle_time
+
+    def __getitem__(self, battle_time: int) -> Events:
+        if self._current is None or self._current[0] != battle_time:
+            raise KeyError(battle_time)
+        return self._current[1]
+
+    def __contains__(self, battle_time) -> bool:
+        return self._current is not None and self._current[0] == battle_time
+
+    def __len__(self) -> int:
+        """Number of battle times streamed so far."""
+        return self._count
+
+
 class ReplayData(NamedTuple):
     """Replay data."""
 
@@ -258,4 +697,5 @@ class ReplayData(NamedTuple):
     owner_id: int
     player_info: dict[int, PlayerInfo]
     building_info: dict[int, BuildingInfo]
-    events: dict[int, Events]
+    events: Union[EventTimeline, EventStream]
+    vehicle_tracks: Optional[VehicleTracks] = None
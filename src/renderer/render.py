@@ -1,10 +1,10 @@
 from json import JSONDecodeError
-from typing import Any, Callable, Optional, Type, Union
+from typing import Any, Callable, Iterable, Optional, Type, Union
 from importlib import import_module
 from renderer.base import LayerBase
 
-from renderer.const import LAYERS
-from renderer.data import ReplayData
+from renderer.const import LAYER_CHANNELS, LAYERS
+from renderer.data import EventStream, ReplayData
 from renderer.utils import draw_grid, LOGGER
 from renderer.resman import ResourceManager
 from renderer.conman import ConsumableManager
@@ -161,6 +161,14 @@ class RendererBase:
         """
         return r * self.minimap_scaling
 
+    @staticmethod
+    def _get_layers_channels(layers: Iterable[str]) -> set[str]:
+        # consumables are tracked by ConsumableManager for all layers
+        channels = {"evt_consumable"}
+        for layer_name in layers:
+            channels.update(LAYER_CHANNELS[layer_name])
+        return channels
+
     def _load_layer(self, layer_name: str) -> Type[LayerBase]:
         assert layer_name in LAYERS
         versioned_layers_pkg = (
@@ -197,6 +205,24 @@ class RenderDual(RendererBase):
         self.team_tracers = team_tracers
         self.use_tqdm = use_tqdm
 
+    @classmethod
+    def get_channels(cls) -> set[str]:
+        """Channels of events needed to render, see ReplayParser."""
+        return cls._get_layers_channels(
+            [
+                "LayerShip",
+                "LayerShot",
+                "LayerTorpedo",
+                "LayerPlane",
+                "LayerWard",
+                "LayerSmoke",
+                "LayerCapture",
+                "LayerScore",
+                "LayerTimer",
+                "LayerMarkers",
+            ]
+        )
+
     def start(
         self,
         path: str,
@@ -339,15 +365,60 @@ class Renderer(RendererBase):
                 name = f"Player {i}"
                 self.usernames[pid] = name
 
+    @classmethod
+    def get_channels(
+        cls, logs: bool = True, enable_chat: bool = True
+    ) -> set[str]:
+        """Channels of events needed to render with given options.
+
+        Pass them to ReplayParser, so nothing else is parsed.
+        """
+        layers = [
+            "LayerShip",
+            "LayerShot",
+            "LayerTorpedo",
+            "LayerSmoke",
+            "LayerPlane",
+            "LayerWard",
+            "LayerBuilding",
+            "LayerCapture",
+            "LayerScore",
+            "LayerTimer",
+            "LayerMarkers",
+        ]
+        if logs:
+            layers += [
+                "LayerHealth",
+                "LayerCounter",
+                "LayerFrag",
+                "LayerRibbon",
+            ]
+            if enable_chat:
+                layers.append("LayerChat")
+        return cls._get_layers_channels(layers)
+
     def _check_if_operations(self):
         self.is_operations = self.replay_data.game_map.startswith('s')
 
     def get_player_build(self) -> list[dict]:
+        """
+        Builds of players;
+        Builds of streamed replay are complete only once it is parsed,
+        as they arrive when ships are spotted.
+        """
+        replay_data = self.replay_data
+        if isinstance(replay_data.events, EventStream):
+            replay_data = replay_data.events.result
+            if replay_data is None:
+                raise RuntimeError(
+                    "Builds are not known before replay is parsed"
+                )
+
         ships = self.resman.load_json("ships.json")
         url = "https://app.wowssb.com/ship?shipIndexes="
         builds = []
 
-        for player in self.replay_data.player_info.values():
+        for player in replay_data.player_info.values():
             if player.relation not in [-1, 0]:
                 continue
 
@@ -402,94 +473,117 @@ class Renderer(RendererBase):
         video_writer.send(None)
 
         self._draw_header(self.minimap_bg)
-        last_key = list(self.replay_data.events)[-1]
+        events = self.replay_data.events
+        # streamed events are drawn while replay is still parsed,
+        # so their count is not known beforehand
+        is_stream = isinstance(events, EventStream)
+        total = None if is_stream else len(events)
 
         if self.use_tqdm:
-            prog = tqdm(self.replay_data.events.keys())
+            prog = tqdm(iter(events), total=total)
         else:
-            prog = self.replay_data.events.keys()
+            prog = iter(events)
 
-        total = len(prog)
         last_per = 0.0
 
-        for idx, game_time in enumerate(prog):
-            if progress_cb:
-                per = round((idx + 1) / total, 1)
-                if per > last_per:
-                    last_per = per
-                    progress_cb(per)
-
-            minimap_img = self.minimap_fg.copy()
-            minimap_bg = self.minimap_bg.copy()
-
-            draw = ImageDraw.Draw(minimap_img)
-            self.conman.update(game_time)
-
-            if not self.is_operations:
-                layer_capture.draw(game_time, minimap_img)
-                layer_score.draw(game_time, minimap_bg)
-
-            layer_building.draw(game_time, minimap_img)
-            layer_ward.draw(game_time, minimap_img)
-            layer_markers.draw(game_time, minimap_img)
-            layer_shot.draw(game_time, minimap_img)
-            layer_torpedo.draw(game_time, draw)
-            layer_ship.draw(game_time, minimap_img)
-            layer_smoke.draw(game_time, minimap_img)
-            layer_plane.draw(game_time, minimap_img)
-            layer_timer.draw(game_time, minimap_bg)
-
-            if self.logs:
-                layer_health.draw(game_time, minimap_bg)
-                layer_counter.draw(game_time, minimap_bg)
-                layer_frag.draw(game_time, minimap_bg)
-
-                layer_ribbon.draw(game_time, minimap_bg)
-                if self.enable_chat:
-                    layer_chat.draw(game_time, minimap_bg)
-
-            self.conman.tick()
+        try:
+            for idx, game_time in enumerate(prog):
+                if progress_cb:
+                    if not is_stream:
+                        per = round((idx + 1) / total, 1)
+                    elif events[game_time].last_frame:
+                        per = 1.0
+                    else:
+                        # battle time and time left add up to battle duration
+                        time_left = events[game_time].time_left
+                        per = round(
+                            game_time / max(game_time + time_left, 1), 1
+                        )
+                    if per > last_per:
+                        last_per = per
+                        progress_cb(per)
+
+                minimap_img = self.minimap_fg.copy()
+                minimap_bg = self.minimap_bg.copy()
+
+                draw = ImageDraw.Draw(minimap_img)
+                self.conman.update(game_time)
+
+                if not self.is_operations:
+                    layer_capture.draw(game_time, minimap_img)
+                    layer_score.draw(game_time, minimap_bg)
+
+                layer_building.draw(game_time, minimap_img)
+                layer_ward.draw(game_time, minimap_img)
+                layer_markers.draw(game_time, minimap_img)
+                layer_shot.draw(game_time, minimap_img)
+                layer_torpedo.draw(game_time, draw)
+                layer_ship.draw(game_time, minimap_img)
+                layer_smoke.draw(game_time, minimap_img)
+                layer_plane.draw(game_time, minimap_img)
+                layer_timer.draw(game_time, minimap_bg)
 
-            if game_time == last_key:
-                img_win = Image.new("RGBA", self.minimap_fg.size)
-                drw_win = ImageDraw.Draw(img_win)
-                font = self.resman.load_font("warhelios_bold.ttf", size=48)
-                player = self.replay_data.player_info[
-                    self.replay_data.owner_id
-                ]
-
-                team_id = self.replay_data.game_result.team_id
-
-                match team_id:
-                    case a if a == player.team_id and a != -1:
-                        text = "VICTORY"
-                    case a if a != player.team_id and a != -1:
-                        text = "DEFEAT"
-                    case _:
-                        text = "DRAW"
-
-                tw, th = map(lambda i: i / 2, font.getbbox(text)[2:])
-                mid_x, mid_y = map(lambda i: i / 2, minimap_img.size)
-                offset_y = 6
-                px, py = mid_x - tw, mid_y - th - offset_y
-
-                for i in range(3 * fps):
-                    per = min(1, i / (1.5 * fps))
-                    drw_win.text(
-                        (px, py),
-                        text=text,
-                        font=font,
-                        fill=(255, 255, 255, round(255 * per)),
-                        stroke_width=4,
-                        stroke_fill=(*self.bg_color[:3], round(255 * per)),
-                    )
-
-                    minimap_img = Image.alpha_composite(minimap_img, img_win)
+                if self.logs:
+                    layer_health.draw(game_time, minimap_bg)
+                    layer_counter.draw(game_time, minimap_bg)
+                    layer_frag.draw(game_time, minimap_bg)
+
+                    layer_ribbon.draw(game_time, minimap_bg)
+                    if self.enable_chat:
+                        layer_chat.draw(game_time, minimap_bg)
+
+                self.conman.tick()
+
+                if events[game_time].last_frame:
+                    img_win = Image.new("RGBA", self.minimap_fg.size)
+                    drw_win = ImageDraw.Draw(img_win)
+                    font = self.resman.load_font("warhelios_bold.ttf", size=48)
+                    player = self.replay_data.player_info[
+                        self.replay_data.owner_id
+                    ]
+
+                    # result of streamed replay is known when it is parsed
+                    if is_stream:
+                        team_id = events.result.game_result.team_id
+                    else:
+                        team_id = self.replay_data.game_result.team_id
+
+                    match team_id:
+                        case a if a == player.team_id and a != -1:
+                            text = "VICTORY"
+                        case a if a != player.team_id and a != -1:
+                            text = "DEFEAT"
+                        case _:
+                            text = "DRAW"
+
+                    tw, th = map(lambda i: i / 2, font.getbbox(text)[2:])
+                    mid_x, mid_y = map(lambda i: i / 2, minimap_img.size)
+                    offset_y = 6
+                    px, py = mid_x - tw, mid_y - th - offset_y
+
+                    for i in range(3 * fps):
+                        per = min(1, i / (1.5 * fps))
+                        drw_win.text(
+                            (px, py),
+                            text=text,
+                            font=font,
+                            fill=(255, 255, 255, round(255 * per)),
+                            stroke_width=4,
+                            stroke_fill=(*self.bg_color[:3], round(255 * per)),
+                        )
+
+                        minimap_img = Image.alpha_composite(
+                            minimap_img, img_win
+                        )
+                        minimap_bg.paste(minimap_img, (40, 90))
+                        video_writer.send(minimap_bg.tobytes())
+                else:
                     minimap_bg.paste(minimap_img, (40, 90))
                     video_writer.send(minimap_bg.tobytes())
-            else:
-                minimap_bg.paste(minimap_img, (40, 90))
-                video_writer.send(minimap_bg.tobytes())
+        finally:
+            # stop parser, when rendering is interrupted
+            if is_stream:
+                events.close()
         video_writer.close()
 
     def _draw_header(self, image: Image.Image):
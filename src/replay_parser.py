@@ -1,21 +1,30 @@
 # coding=utf-8
-from typing import BinaryIO
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
 import logging
+import mmap
 import os
 import json
-import struct
-import zlib
+import threading
 
+from renderer.data import EventFeed, EventStream, ReplayData
 from replay_unpack.clients import wot, wows
+from replay_unpack.clients.wows.helper import is_supported_version
+from replay_unpack.core.tracing import TraceSink
+from replay_unpack.payload_cache import PayloadCache
 from replay_unpack.replay_reader import (
     ReplayReader,
     ReplayInfo,
-    REPLAY_SIGNATURE,
+    map_replay,
 )
 
 
 class DefaultEncoder(json.JSONEncoder):
     def default(self, o):
+        if isinstance(o, Mapping):
+            return dict(o)
         try:
             return o.__dict__
         except AttributeError:
@@ -24,73 +33,72 @@ class DefaultEncoder(json.JSONEncoder):
 
 class CustomReader(ReplayReader):
     # noinspection PyMissingConstructor
-    def __init__(self, fp: BinaryIO, dump_binary=False):
+    def __init__(
+        self,
+        fp: Union[BinaryIO, str, mmap.mmap],
+        dump_binary=False,
+        cache: Optional[PayloadCache] = None,
+    ):
         self._dump_binary_data = dump_binary
-        self._fp = fp
+        self._cache = cache
+        self._replay = fp
+        self._replay_path = str(getattr(fp, "name", fp))
         self._type = "wowsreplay"
 
-    def get_replay_data(self) -> ReplayInfo:
+    def get_replay_data(self, stream=False) -> ReplayInfo:
         """
         Get open info about replay
         (stored as Json at the beginning of file)
         and closed one
         (after decrypt & decompress);
+        Use stream=True to get closed info as iterator over
+        decompressed chunks instead of reading whole payload into memory;
         :rtype: tuple[dict, str]
         """
-        if self._fp.read(4) != REPLAY_SIGNATURE:
-            raise ValueError(
-                "File %s is not a valid replay" % self._replay_path
-            )
-
-        blocks_count = struct.unpack("i", self._fp.read(4))[0]
-
-        block_size = struct.unpack("i", self._fp.read(4))[0]
-        engine_data = json.loads(self._fp.read(block_size))
-
+        view = map_replay(self._replay)
+        engine_data, _, offset = self._read_blocks(view)
         extra_data = []
-        for i in range(blocks_count - 1):
-            block_size = struct.unpack("i", self._fp.read(4))[0]
-            _ = self._fp.read(block_size)
-
-            # data = json.loads(self._fp.read(block_size))
-            # extra_data.append(data)
-
-        # noinspection PyUnresolvedReferences
-        decrypted_data = zlib.decompress(
-            self._ReplayReader__decrypt_data(self._fp.read())
-        )
-
-        if self._dump_binary_data:
-            self._save_decrypted_data(decrypted_data)
 
         return ReplayInfo(
             game="wows",
             engine_data=engine_data,
             extra_data=extra_data,
-            decrypted_data=decrypted_data,
+            decrypted_data=self._get_decrypted_data(view[offset:], stream),
         )
 
 
 class ReplayParser(object):
     BASE_PATH = os.path.dirname(__file__)
+    # game mode of scenario battles (operations),
+    # where bots join while battle goes on
+    SCENARIO_GAME_MODE = 14
 
     def __init__(
         self,
-        fp: BinaryIO,
+        fp: Union[BinaryIO, str, mmap.mmap],
         strict: bool = False,
         raw_data_output=None,
         logging_level: int = logging.ERROR,
+        stream: bool = False,
+        cache: Optional[PayloadCache] = None,
+        trace_sink: Optional[TraceSink] = None,
+        channels: Optional[Iterable[str]] = None,
     ):
         self._fp = fp
         self._is_strict_mode = strict
-        self._reader = CustomReader(fp)
+        self._is_stream_mode = stream
+        self._reader = CustomReader(fp, cache=cache)
         self._raw_data_output = raw_data_output
+        self._trace_sink = trace_sink
+        # channels of events recorded for wows replays, all by default;
+        # vehicle_tracks of replay data is None unless evt_vehicle is recorded
+        self._channels = channels
         logging.basicConfig(level=logging_level)
         root = logging.getLogger()
         root.setLevel(logging.ERROR)
 
     def get_info(self):
-        replay = self._reader.get_replay_data()
+        replay = self._reader.get_replay_data(stream=self._is_stream_mode)
 
         error = None
         try:
@@ -104,6 +112,8 @@ class ReplayParser(object):
             # raise error in strict mode
             if self._is_strict_mode:
                 raise
+        finally:
+            self._close_payload(replay)
 
         return dict(
             open=replay.engine_data,
@@ -112,7 +122,88 @@ class ReplayParser(object):
             error=error,
         )
 
-    def _get_hidden_data(self, replay: ReplayInfo):
+    def probe(self):
+        """
+        Get open info about replay and cheap derived fields
+        without decrypting and playing hidden data.
+        """
+        probe = self._reader.probe()
+        version = (
+            probe.engine_data.get("clientVersionFromXml", "")
+            .replace(" ", "")
+            .split(",")
+        )
+
+        return dict(
+            open=probe.engine_data,
+            map=probe.engine_data.get("mapName", "").removeprefix("spaces/"),
+            version="_".join(version[:3]),
+            players=probe.engine_data.get("vehicles", []),
+            duration=probe.engine_data.get("duration"),
+            arena_id=probe.arena_id,
+            payload_size=probe.payload_size,
+            is_supported=is_supported_version("_".join(version[:4]))
+            or is_supported_version("_".join(version[:3])),
+            error=None,
+        )
+
+    def stream(self, maxsize: int = EventStream.MAXSIZE) -> ReplayData:
+        """
+        Parse wows replay in background thread;
+        Replay data is returned as soon as battle starts, with events
+        streamed while replay is still parsed (see EventStream),
+        so rendering does not wait for parsing to finish;
+        Replays of scenario battles are parsed before they are returned,
+        as their players are known only at the end.
+        """
+        if self._reader.probe().engine_data.get("gameMode") == self.SCENARIO_GAME_MODE:
+            replay = self._reader.get_replay_data(stream=self._is_stream_mode)
+            try:
+                return self._get_hidden_data(replay)["replay_data"]
+            finally:
+                self._close_payload(replay)
+
+        events = EventStream(maxsize)
+        header = Future()
+        threading.Thread(
+            target=self._produce_events, args=(events.feed, header), daemon=True
+        ).start()
+        return header.result()._replace(events=events)
+
+    def _produce_events(self, feed: EventFeed, header: Future):
+        replay = None
+        try:
+            replay = self._reader.get_replay_data(stream=self._is_stream_mode)
+            if replay.game != "wows":
+                raise NotImplementedError(
+                    "Only wows replays can be streamed"
+                )
+            player = self._get_player(replay)
+            for battle_time, events in player.iter_events(
+                replay.decrypted_data, self._is_strict_mode
+            ):
+                if not header.done():
+                    header.set_result(player.get_replay_data())
+                if events.last_frame:
+                    feed.result = player.get_replay_data()
+                if not feed.put(battle_time, events):
+                    # stream was closed by consumer
+                    return
+        except Exception as e:
+            logging.exception(e)
+            if not header.done():
+                header.set_exception(e)
+            feed.finish(e)
+            return
+        finally:
+            if replay is not None:
+                self._close_payload(replay)
+
+        if not header.done():
+            header.set_exception(RuntimeError("Replay has no events"))
+        feed.finish()
+
+    def _get_player(self, replay: ReplayInfo):
         if replay.game == "wot":
             # 'World of Tanks v.1.8.0.2 #252'
             version = ".".join(
@@ -122,15 +213,29 @@ class ReplayParser(object):
                 .replace("#", "")
                 .split(".")[:3]
             )
-            player = wot.ReplayPlayer(version)
+            player = wot.ReplayPlayer(version, self._trace_sink)
         elif replay.game == "wows":
             player = wows.ReplayPlayer(
                 replay.engine_data.get("clientVersionFromXml")
                 .replace(" ", "")
-                .split(",")
+                .split(","),
+                self._trace_sink,
+                self._channels,
             )
         else:
             raise NotImplementedError
+        return player
+
+    def _get_hidden_data(self, replay: ReplayInfo):
+        player = self._get_player(replay)
+
+        if self._raw_data_output and self._is_stream_mode:
+            with open(self._raw_data_output, "wb") as fp:
+                player.play(
+                    self._iter_and_write(replay.decrypted_data, fp),
+                    self._is_strict_mode,
+                )
+            return player.get_info()
 
         if self._raw_data_output:
             with open(self._raw_data_output, "wb") as fp:
@@ -139,6 +244,55 @@ class ReplayParser(object):
         player.play(replay.decrypted_data, self._is_strict_mode)
         return player.get_info()
 
+    @staticmethod
+    def _close_payload(replay: ReplayInfo):
+        """
+        Close payload mapped from cache once replay is played,
+        mapped entry can be neither evicted nor replaced on windows
+        """
+        if isinstance(replay.decrypted_data, mmap.mmap):
+            try:
+                replay.decrypted_data.close()
+            except BufferError:
+                # still referenced (e.g. by traceback), left to gc
+                pass
+
+    @staticmethod
+    def _iter_and_write(chunks, fp: BinaryIO):
+        for chunk in chunks:
+            fp.write(chunk)
+            yield chunk
+
+
+def _probe_file(path) -> tuple[str, dict]:
+    try:
+        return str(path), ReplayParser(path).probe()
+    except Exception as e:
+        logging.exception(e)
+        return str(path), dict(error=str(e))
+
+
+def probe_replays(
+    paths: Iterable, max_workers: Optional[int] = None
+) -> Iterator[tuple[str, dict]]:
+    """
+    Probe many replays using thread pool,
+    yields (path, info) pairs in order of given paths.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(_probe_file, paths)
+
+
+def probe_directory(
+    directory: str, max_workers: Optional[int] = None
+) -> Iterator[tuple[str, dict]]:
+    """
+    Probe all replays in given directory, see probe_replays.
+    """
+    yield from probe_replays(
+        sorted(Path(directory).glob("*.wowsreplay")), max_workers
+    )
+
 
 def main(replay, strict_mode, raw_data_output):
     logging.basicConfig(level=getattr(logging, namespace.log_level))
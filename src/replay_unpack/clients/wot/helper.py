@@ -4,14 +4,23 @@ __author__ = "Aleksandr Shyshatsky"
 
 import importlib
 import os
+from functools import lru_cache
 
 from replay_unpack.core.entity_def.definitions import Definitions
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+# compiled definitions are stored here, set to None to disable
+DEFINITIONS_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'replay_unpack', 'definitions', 'wot')
 
 
+@lru_cache(maxsize=8)
 def get_definitions(version):
-    return Definitions(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+    """
+    Get definitions of given version, loaded at most once per process.
+    """
+    version = version.replace('.', '_')
+    return Definitions.load(os.path.join(BASE_DIR, 'versions', version), DEFINITIONS_CACHE_DIR)
 
 
 def get_controller(version):
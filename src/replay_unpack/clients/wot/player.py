@@ -33,6 +33,11 @@ class ReplayPlayer(ControlledPlayerBase):
     def _get_packets_mapping(self):
         return PACKETS_MAPPING
 
+    def _get_setup_packets(self):
+        return (Map, BasePlayerCreate, CellPlayerCreate,
+                EntityCreate, EntityEnter, EntityLeave,
+                EntityMethod, EntityProperty, NestedProperty)
+
     def _process_packet(self, packet):
 
         if isinstance(packet, Map):
@@ -45,7 +50,8 @@ class ReplayPlayer(ControlledPlayerBase):
                 base_player = self._battle_controller.entities[packet.entityId]
             else:
                 base_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # base is internal, so props are stored in order of xml file
             # io = BytesIO(packet.value.value)
@@ -61,7 +67,8 @@ class ReplayPlayer(ControlledPlayerBase):
                 cell_player = self._battle_controller.entities[packet.entityId]
             else:
                 cell_player = Entity(id_=packet.entityId,
-                                     spec=self._definitions.get_entity_def_by_name('Avatar'))
+                                     spec=self._definitions.get_entity_def_by_name('Avatar'),
+                                     subscriptions=self._battle_controller.subscriptions)
 
             # cell is internal, so props are stored in order of xml file
             io = packet.value.io()
@@ -72,15 +79,16 @@ class ReplayPlayer(ControlledPlayerBase):
             self._battle_controller.create_entity(cell_player)
 
         elif isinstance(packet, EntityEnter):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = True
+            self._battle_controller.entities[packet.entityId].is_on_aoi = True
 
         elif isinstance(packet, EntityLeave):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = False
+            self._battle_controller.entities[packet.entityId].is_on_aoi = False
 
         elif isinstance(packet, EntityCreate):
             entity = Entity(
                 id_=packet.entityID,
-                spec=self._definitions.get_entity_def_by_index(packet.type))
+                spec=self._definitions.get_entity_def_by_index(packet.type),
+                subscriptions=self._battle_controller.subscriptions)
 
             values = packet.state.io()
             values_count, = struct.unpack('B', values.read(1))
@@ -92,10 +100,8 @@ class ReplayPlayer(ControlledPlayerBase):
             self._battle_controller.create_entity(entity)
 
         elif isinstance(packet, Position):
-            self._battle_controller.entities[packet.entityId].position = packet.position
-            self._battle_controller.entities[packet.entityId].yaw = packet.yaw
-            self._battle_controller.entities[packet.entityId].pitch = packet.pitch
-            self._battle_controller.entities[packet.entityId].roll = packet.roll
+            self._battle_controller.entities[packet.entityId].set_volatiles(
+                packet.position, packet.yaw, packet.pitch, packet.roll)
 
         elif isinstance(packet, EntityMethod):
             entity = self._battle_controller.entities[packet.entityId]
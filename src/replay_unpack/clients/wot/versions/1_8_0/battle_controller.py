@@ -2,18 +2,20 @@
 
 from replay_unpack.core import IBattleController
 from replay_unpack.core.entity import Entity
+from replay_unpack.core.subscriptions import Subscriptions
 
 
 class BattleController(IBattleController):
 
     def __init__(self):
         self._entities = {}
+        self._subscriptions = Subscriptions()
 
         self._map = None
         self._player_id = None
         self._tracerts = []
         # just for test
-        Entity.subscribe_method_call('Avatar', 'showTracer', lambda *args: self._tracerts.append(args[1:]))
+        self._subscriptions.subscribe_method_call('Avatar', 'showTracer', lambda *args: self._tracerts.append(args[1:]))
 
     @property
     def entities(self):
@@ -4,19 +4,92 @@ __author__ = "Aleksandr Shyshatsky"
 
 import importlib
 import os
+from functools import lru_cache
+from typing import Iterable, Optional
 
+from replay_unpack.core import IBattleController
 from replay_unpack.core.entity_def.definitions import Definitions
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+# compiled definitions are stored here, set to None to disable
+DEFINITIONS_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'replay_unpack', 'definitions', 'wows')
 
 
+@lru_cache(maxsize=8)
 def get_definitions(version):
-    return Definitions(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+    """
+    Get definitions of given version, loaded at most once per process.
+    """
+    version = version.replace('.', '_')
+    return Definitions.load(os.path.join(BASE_DIR, 'versions', version), DEFINITIONS_CACHE_DIR)
+
+
+def is_supported_version(version):
+    """
+    Check if given version is supported without loading its definitions.
+    """
+    return os.path.isdir(os.path.join(BASE_DIR, 'versions', version.replace('.', '_')))
+
+
+# handlers of battle controllers, which feed only given channels of events,
+# handlers needed for anything else (e.g. players or deaths info) are not listed
+CHANNEL_HANDLERS = {
+    '_set_health': ('evt_vehicle',),
+    '_set_is_alive': ('evt_vehicle',),
+    '_set_is_invisible': ('evt_vehicle',),
+    '_set_visibility_flag': ('evt_vehicle',),
+    '_set_burning_flags': ('evt_vehicle',),
+    '_set_regenerated_health': ('evt_vehicle',),
+    '_set_regen_crew_hp_limit': ('evt_vehicle',),
+    '_set_regeneration_health': ('evt_vehicle',),
+    'onSetConsumable': ('evt_vehicle',),
+    '_update_position': ('evt_vehicle', 'evt_building'),
+    '_is_suppressed': ('evt_building',),
+    '_is_alive': ('evt_building',),
+    '_r_shots': ('evt_shot',),
+    '_receiveTorpedoes': ('evt_torpedo',),
+    '_set_hits': ('evt_hits',),
+    '_on_consumable_used': ('evt_consumable',),
+    '_add_plane': ('evt_plane',),
+    '_update_plane': ('evt_plane',),
+    '_remove_plane': ('evt_plane',),
+    '_add_ward': ('evt_ward',),
+    '_remove_ward': ('evt_ward',),
+    '_set_smoke_points': ('evt_smoke',),
+    '_set_caps': ('evt_control', 'evt_times_to_win'),
+    '_update_caps': ('evt_control', 'evt_times_to_win'),
+    '_set_control_points': ('evt_control', 'evt_times_to_win'),
+    '_set_score': ('evt_score', 'evt_times_to_win'),
+    'receiveDamageStat': ('evt_damage_maps',),
+    '_update_ribbons': ('evt_ribbon',),
+    'onRibbon': ('evt_ribbon',),
+    'onAchievementEarned': ('evt_achievement',),
+    '_on_chat_message': ('evt_chat',),
+    '_receive_torpedo_dir': ('evt_acoustic_torpedo',),
+}
+
+
+def disable_event_channels(controller: IBattleController, channels: Optional[Iterable[str]]):
+    """
+    Unsubscribe handlers of controller, which feed only channels of events
+    not in given ones, so their methods and properties are never decoded;
+    Damage maps, ribbons and achievements in info of disabled channels stay empty.
+    """
+    if channels is None:
+        return
+
+    channels = set(channels)
+    for name, handler_channels in CHANNEL_HANDLERS.items():
+        handler = getattr(controller, name, None)
+        if handler is not None and channels.isdisjoint(handler_channels):
+            controller.subscriptions.unsubscribe(handler)
 
 
-def get_controller(version):
+def get_controller(version, channels: Optional[Iterable[str]] = None):
     """
-    Get real controller class by game version.
+    Get real controller class by game version,
+    with given channels of events enabled (all by default).
     """
     try:
         module = importlib.import_module('.versions.%s' % version, package=__package__)
@@ -24,7 +97,7 @@ def get_controller(version):
         raise RuntimeError("version %s is not supported currently" % version)
 
     try:
-        conrtoller = module.BattleController()
+        conrtoller = module.BattleController(channels)
     except AttributeError:
         raise AssertionError("battle controller for version %s "
                              "should contain BattleController class" % version)
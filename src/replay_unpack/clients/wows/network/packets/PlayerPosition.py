@@ -1,11 +1,14 @@
 # coding=utf-8
 import struct
-from io import BytesIO
 
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import Vector3
 
 
+IDS = struct.Struct('ii')
+ROTATION = struct.Struct('fff')
+
+
 class PlayerPosition(PrettyPrintObjectMixin):
     __slots__ = (
         'entityId1',
@@ -17,8 +20,6 @@ class PlayerPosition(PrettyPrintObjectMixin):
     )
     
     def __init__(self, stream):
-        # type: (BytesIO) -> ()
-
         self.entityId1, = struct.unpack('i', stream.read(4))
         self.entityId2, = struct.unpack('i', stream.read(4))
 
@@ -26,4 +27,12 @@ class PlayerPosition(PrettyPrintObjectMixin):
         self.yaw, = struct.unpack('f', stream.read(4))
         self.pitch, = struct.unpack('f', stream.read(4))
         self.roll, = struct.unpack('f', stream.read(4))
-        
\ No newline at end of file
+        
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> 'PlayerPosition':
+        packet = cls.__new__(cls)
+        packet.entityId1, packet.entityId2 = IDS.unpack_from(buffer, offset)
+        packet.position = Vector3.from_buffer(buffer, offset + 8)
+        packet.yaw, packet.pitch, packet.roll = ROTATION.unpack_from(buffer, offset + 20)
+        return packet
@@ -1,10 +1,16 @@
 # coding=utf-8
 import logging
+import mmap
 import struct
+from collections import deque
 from io import BytesIO
+from typing import Callable, Dict, Generator, Iterable, Iterator, Optional, Set, Union
 
+from renderer.data import Events, ReplayData
 from replay_unpack.core import Entity
 from replay_unpack.core.network.player import ControlledPlayerBase
+from replay_unpack.core.tracing import TraceSink
+from replay_unpack.core.packets.EntityMethod import HEADER as ENTITY_METHOD_HEADER
 from .helper import get_definitions, get_controller
 from .network.packets import (
     Map,
@@ -24,6 +30,29 @@ from .network.packets import (
 
 
 class ReplayPlayer(ControlledPlayerBase):
+    def __init__(
+        self,
+        version: list[str],
+        trace_sink: Optional[TraceSink] = None,
+        channels: Optional[Iterable[str]] = None,
+    ):
+        """
+        Only given channels of events are recorded (all by default),
+        packets feeding other channels are not decoded;
+        Vehicle tracks are recorded only along with evt_vehicle
+        """
+        # used by _get_controller, which is called by base constructor
+        self._channels = channels
+        super(ReplayPlayer, self).__init__(version, trace_sink)
+        self._handlers = self._get_handlers()
+
+        # entity name -> exposed indices of methods with subscribers
+        self._subscribed_methods: Dict[str, Set[int]] = {}
+        for packet_type, packet_class in self._mapping.items():
+            if packet_class is EntityMethod:
+                self._deserializers[packet_type] = (
+                    self._read_entity_method, EntityMethod)
+
     def _get_definitions(self, version):
         try:
             return get_definitions("_".join(version[:4]))
@@ -32,9 +61,9 @@ class ReplayPlayer(ControlledPlayerBase):
 
     def _get_controller(self, version):
         try:
-            return get_controller("_".join(version[:4]))
+            return get_controller("_".join(version[:4]), self._channels)
         except RuntimeError:
-            return get_controller("_".join(version[:3]))
+            return get_controller("_".join(version[:3]), self._channels)
 
     def _get_packets_mapping(self):
         # Since gameclient version 12.6.0, some packets have had their indices changed.
@@ -43,148 +72,233 @@ class ReplayPlayer(ControlledPlayerBase):
         else:
             return PACKETS_MAPPING
 
+    def _get_setup_packets(self):
+        # everything but positions, which are resent continuously anyway,
+        # as battle controller state is built from entity methods and properties
+        return (Version, Map, BasePlayerCreate, CellPlayerCreate,
+                EntityCreate, EntityEnter, EntityLeave,
+                EntityMethod, EntityProperty, NestedProperty)
+
+    def _get_handlers(self) -> Dict[type, Callable]:
+        return {
+            Version: self._on_version,
+            Map: self._on_map,
+            BasePlayerCreate: self._on_base_player_create,
+            CellPlayerCreate: self._on_cell_player_create,
+            EntityEnter: self._on_entity_enter,
+            EntityLeave: self._on_entity_leave,
+            EntityCreate: self._on_entity_create,
+            Position: self._on_position,
+            PlayerPosition: self._on_player_position,
+            EntityMethod: self._on_entity_method,
+            EntityProperty: self._on_entity_property,
+            NestedProperty: self._on_nested_property,
+        }
+
+    def set_handler(self, packet_class: type, handler: Optional[Callable]):
+        """
+        Replace handler of given packet class,
+        packets of this class are ignored if handler is None
+        """
+        if handler is None:
+            self._handlers.pop(packet_class, None)
+        else:
+            self._handlers[packet_class] = handler
+
+    def _iter_play(self, replay_data: Union[bytes, mmap.mmap, Iterable[bytes]], strict_mode=False,
+                   start: Optional[float] = None, end: Optional[float] = None) -> Iterator[float]:
+        if start is not None:
+            # setup packets before time window only restore state of battle
+            self._battle_controller.set_record_start(start)
+        return super(ReplayPlayer, self)._iter_play(replay_data, strict_mode, start, end)
+
+    def iter_events(
+        self,
+        replay_data: Union[bytes, mmap.mmap, Iterable[bytes]],
+        strict_mode=False,
+    ) -> Generator[tuple[int, Events], None, dict]:
+        """
+        Play replay data like play, yielding (battle_time, events)
+        as soon as events of each battle time are complete,
+        events of last frame are yielded once replay is played;
+        Returns info of played replay, see get_info
+        """
+        complete = deque()
+        timeline = self._battle_controller._dict_events
+        timeline.listener = lambda *item: complete.append(item)
+        try:
+            for _ in self._iter_play(replay_data, strict_mode):
+                while complete:
+                    yield complete.popleft()
+            info = self.get_info()
+            while complete:
+                yield complete.popleft()
+        finally:
+            timeline.listener = None
+        return info
+
+    def get_replay_data(self) -> ReplayData:
+        return self._battle_controller.get_replay_data()
+
+    def _read_entity_method(self, buffer: memoryview, offset: int, size: int) -> Optional[EntityMethod]:
+        """
+        Read only header of method call and skip it,
+        if nobody is subscribed to called method
+        """
+        entity_id, message_id = ENTITY_METHOD_HEADER.unpack_from(buffer, offset)
+        entity = self._battle_controller.entities.get(entity_id)
+        if entity is not None:
+            try:
+                subscribed_methods = self._subscribed_methods[entity.get_name()]
+            except KeyError:
+                subscribed_methods = self._subscribed_methods[entity.get_name()] = \
+                    entity.get_subscribed_methods()
+            if message_id not in subscribed_methods:
+                return None
+        return EntityMethod.from_buffer(buffer, offset, size)
+
+    def _read_skipped_packet(self, packet) -> Optional[EntityMethod]:
+        # method calls without subscribers are the only skipped packets
+        if self._mapping.get(packet.type) is EntityMethod:
+            return EntityMethod.from_buffer(packet.buffer, packet.offset, packet.size)
+        return None
+
     def _process_packet(self, packet, t: float):
         self._battle_controller.set_packet_time(t)
 
-        if isinstance(packet, Version):
-            self._battle_controller._version = packet.version
+        handler = self._handlers.get(packet.__class__)
+        if handler is not None:
+            handler(packet)
 
-        if isinstance(packet, Map):
-            logging.debug("Welcome to map %s: %s", packet.name, packet.arenaId)
-            self._battle_controller.map = packet.name
+    def _on_version(self, packet: Version):
+        self._battle_controller._version = packet.version
 
-        elif isinstance(packet, BasePlayerCreate):
-            # I'm not sure what is the order of cell/base/client player creation
-            if packet.entityId in self._battle_controller.entities:
-                base_player = self._battle_controller.entities[packet.entityId]
-            else:
-                base_player = Entity(
-                    id_=packet.entityId,
-                    spec=self._definitions.get_entity_def_by_name("Avatar"),
-                )
+    def _on_map(self, packet: Map):
+        logging.debug("Welcome to map %s: %s", packet.name, packet.arenaId)
+        self._battle_controller.map = packet.name
 
-            # base is internal, so props are stored in order of xml file
-            io = BytesIO(packet.value.value)
-            for index, prop in enumerate(base_player.base_properties):
-                base_player.set_base_property(index, io)
+    def _on_base_player_create(self, packet: BasePlayerCreate):
+        # I'm not sure what is the order of cell/base/client player creation
+        if packet.entityId in self._battle_controller.entities:
+            base_player = self._battle_controller.entities[packet.entityId]
+        else:
+            base_player = Entity(
+                id_=packet.entityId,
+                spec=self._definitions.get_entity_def_by_name("Avatar"),
+                subscriptions=self._battle_controller.subscriptions,
+            )
 
-            self._battle_controller.create_entity(base_player)
-            self._battle_controller.on_player_enter_world(packet.entityId)
+        # base is internal, so props are stored in order of xml file
+        io = BytesIO(packet.value.value)
+        for index, prop in enumerate(base_player.base_properties):
+            base_player.set_base_property(index, io)
 
-        elif isinstance(packet, CellPlayerCreate):
-            # I'm not sure what is the order of cell/base/client player creation
-            if packet.entityId in self._battle_controller.entities:
-                cell_player = self._battle_controller.entities[packet.entityId]
-            else:
-                cell_player = Entity(
-                    id_=packet.entityId,
-                    spec=self._definitions.get_entity_def_by_name("Avatar"),
-                )
+        self._battle_controller.create_entity(base_player)
+        self._battle_controller.on_player_enter_world(packet.entityId)
 
-            # cell is internal, so props are stored in order of xml file
-            io = packet.value.io()
-            for index, prop in enumerate(
-                cell_player.client_properties_internal
-            ):
-                cell_player.set_client_property_internal(index, io)
-            # TODO: why this assert fails?
-            # assert io.read() == b''
-            self._battle_controller.create_entity(cell_player)
-
-        elif isinstance(packet, EntityEnter):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = True
-
-        elif isinstance(packet, EntityLeave):
-            self._battle_controller.entities[packet.entityId].is_in_aoi = False
-            self._battle_controller.leave_entity(packet.entityId)
-
-        elif isinstance(packet, EntityCreate):
-            entity = Entity(
-                id_=packet.entityID,
-                spec=self._definitions.get_entity_def_by_index(packet.type),
+    def _on_cell_player_create(self, packet: CellPlayerCreate):
+        # I'm not sure what is the order of cell/base/client player creation
+        if packet.entityId in self._battle_controller.entities:
+            cell_player = self._battle_controller.entities[packet.entityId]
+        else:
+            cell_player = Entity(
+                id_=packet.entityId,
+                spec=self._definitions.get_entity_def_by_name("Avatar"),
+                subscriptions=self._battle_controller.subscriptions,
             )
 
-            entity.position = packet.position
-
-            values = packet.state.io()
-            (values_count,) = struct.unpack("B", values.read(1))
-            for i in range(values_count):
-                k = values.read(1)
-                (idx,) = struct.unpack("B", k)
-                entity.set_client_property(idx, values)
-            assert values.read() == b""
-            self._battle_controller.create_entity(entity)
-
-        elif isinstance(packet, Position):
-            self._battle_controller.entities[
-                packet.entityId
-            ].position = packet.position
-            self._battle_controller.entities[packet.entityId].yaw = packet.yaw
-            self._battle_controller.entities[
-                packet.entityId
-            ].pitch = packet.pitch
-            self._battle_controller.entities[
-                packet.entityId
-            ].roll = packet.roll
-
-        elif isinstance(packet, PlayerPosition):
-            try:
-                # Entity at ID 1 is the primary one's position being updated
-                # Avatar-only packets have no position until death, and
-                # are linked to a vehicle. After death they have no ID for a
-                # Vehicle anymore, and a position instead.
-                # Before death only "Vehicle in ID 1" packets have a position.
-
-                if packet.entityId2 != (0,):
-                    # This serves to link the positions of the two entities
-                    # where the position of entity 1 is set by wherever entity 2
-                    # is, rather than by the position field.
-                    # e.g. Assigning the Avatar the position of the Vehicle
-                    master_entity = self._battle_controller.entities[
-                        packet.entityId2
-                    ]
-                    slave_entity = self._battle_controller.entities[
-                        packet.entityId1
-                    ]
-
-                    slave_entity.position = master_entity.position
-                    slave_entity.yaw = master_entity.yaw
-                    slave_entity.pitch = master_entity.pitch
-                    slave_entity.roll = master_entity.roll
-
-                elif packet.entityId1 != 0 and packet.entityId2 == 0:
-                    # This is a regular update for entity 1, without entity 2
-                    e = self._battle_controller.entities[packet.entityId1]
-
-                    e.position = packet.position
-                    e.yaw = packet.yaw
-                    e.pitch = packet.pitch
-                    e.roll = packet.roll
-
-                else:
-                    # Shouldn't hit this case, with no primary OR secondary entity
-                    pass
-
-            except KeyError as e:
-                # entity not yet created
+        # cell is internal, so props are stored in order of xml file
+        io = packet.value.io()
+        for index, prop in enumerate(
+            cell_player.client_properties_internal
+        ):
+            cell_player.set_client_property_internal(index, io)
+        # TODO: why this assert fails?
+        # assert io.read() == b''
+        self._battle_controller.create_entity(cell_player)
+
+    def _on_entity_enter(self, packet: EntityEnter):
+        self._battle_controller.entities[packet.entityId].is_on_aoi = True
+
+    def _on_entity_leave(self, packet: EntityLeave):
+        self._battle_controller.entities[packet.entityId].is_on_aoi = False
+        self._battle_controller.leave_entity(packet.entityId)
+
+    def _on_entity_create(self, packet: EntityCreate):
+        entity = Entity(
+            id_=packet.entityID,
+            spec=self._definitions.get_entity_def_by_index(packet.type),
+            subscriptions=self._battle_controller.subscriptions,
+        )
+
+        entity.position = packet.position
+
+        values = packet.state.io()
+        (values_count,) = struct.unpack("B", values.read(1))
+        for i in range(values_count):
+            k = values.read(1)
+            (idx,) = struct.unpack("B", k)
+            entity.set_client_property(idx, values)
+        assert values.read() == b""
+        self._battle_controller.create_entity(entity)
+
+    def _on_position(self, packet: Position):
+        self._battle_controller.entities[packet.entityId].set_volatiles(
+            packet.position, packet.yaw, packet.pitch, packet.roll
+        )
+
+    def _on_player_position(self, packet: PlayerPosition):
+        try:
+            # Entity at ID 1 is the primary one's position being updated
+            # Avatar-only packets have no position until death, and
+            # are linked to a vehicle. After death they have no ID for a
+            # Vehicle anymore, and a position instead.
+            # Before death only "Vehicle in ID 1" packets have a position.
+
+            if packet.entityId2 != (0,):
+                # This serves to link the positions of the two entities
+                # where the position of entity 1 is set by wherever entity 2
+                # is, rather than by the position field.
+                # e.g. Assigning the Avatar the position of the Vehicle
+                master_entity = self._battle_controller.entities[
+                    packet.entityId2
+                ]
+                slave_entity = self._battle_controller.entities[
+                    packet.entityId1
+                ]
+
+                slave_entity.set_volatiles(
+                    master_entity.position,
+                    master_entity.yaw,
+                    master_entity.pitch,
+                    master_entity.roll,
+                )
+
+            elif packet.entityId1 != 0 and packet.entityId2 == 0:
+                # This is a regular update for entity 1, without entity 2
+                e = self._battle_controller.entities[packet.entityId1]
+
+                e.set_volatiles(
+                    packet.position, packet.yaw, packet.pitch, packet.roll
+                )
+
+            else:
+                # Shouldn't hit this case, with no primary OR secondary entity
                 pass
 
-        elif isinstance(packet, EntityMethod):
-            entity = self._battle_controller.entities[packet.entityId]
-            entity.call_client_method(packet.messageId, packet.data.io())
+        except KeyError as e:
+            # entity not yet created
+            pass
 
-        elif isinstance(packet, EntityProperty):
-            entity = self._battle_controller.entities[packet.objectID]
-            entity.set_client_property(packet.messageId, packet.data.io())
+    def _on_entity_method(self, packet: EntityMethod):
+        entity = self._battle_controller.entities[packet.entityId]
+        entity.call_client_method(packet.messageId, packet.data.io())
 
-        elif isinstance(packet, NestedProperty):
-            e = self._battle_controller.entities[packet.entity_id]
+    def _on_entity_property(self, packet: EntityProperty):
+        entity = self._battle_controller.entities[packet.objectID]
+        entity.set_client_property(
+            packet.messageId, packet.data.io(), single_value=True)
 
-            logging.debug("")
-            logging.debug(
-                "nested property request for id=%s isSlice=%s packet=%s",
-                e.id,
-                packet.is_slice,
-                packet.payload.hex(),
-            )
-            packet.read_and_apply(e)
+    def _on_nested_property(self, packet: NestedProperty):
+        e = self._battle_controller.entities[packet.entity_id]
+        packet.read_and_apply(e)
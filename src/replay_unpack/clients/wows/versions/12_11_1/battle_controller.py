@@ -7,6 +7,8 @@ import struct
 from io import BytesIO
 from replay_unpack.core import IBattleController
 from replay_unpack.core.entity import Entity
+from replay_unpack.core.subscriptions import Subscriptions
+from replay_unpack.clients.wows.helper import disable_event_channels
 from replay_unpack.core.entity_def.data_types.nested_types import PyFixedDict
 from .constants import DamageStatsType, Category, TaskType, Status
 
@@ -15,6 +17,8 @@ from renderer.data import (
     Vehicle,
     ReplayData,
     Events,
+    EventTimeline,
+    VehicleTracks,
     Smoke,
     Shot,
     Torpedo,
@@ -33,7 +37,7 @@ from renderer.data import (
     AcousticTorpedo,
 )
 from replay_unpack.utils import (
-    unpack_values,
+    unpack_minimap_values,
     unpack_plane_id,
     restricted_loads,
 )
@@ -47,8 +51,9 @@ from .players_info import PlayersInfo, PlayerType
 
 
 class BattleController(IBattleController):
-    def __init__(self):
+    def __init__(self, channels=None):
         self._entities = {}
+        self._subscriptions = Subscriptions()
         self._achievements = {}
         self._ribbons = {}
         self._players = PlayersInfo()
@@ -61,34 +66,36 @@ class BattleController(IBattleController):
         self._arena_id: int = 0
         self._dead_planes = {}
 
-        Entity.subscribe_method_call("Avatar", "onBattleEnd", self.onBattleEnd)
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
+            "Avatar", "onBattleEnd", self.onBattleEnd
+        )
+        self._subscriptions.subscribe_method_call(
             "Avatar", "onArenaStateReceived", self.onArenaStateReceived
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "onGameRoomStateChanged", self.onPlayerInfoUpdate
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receiveVehicleDeath", self.receiveVehicleDeath
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Vehicle", "setConsumables", self.onSetConsumable
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "onAchievementEarned", self.onAchievementEarned
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receiveDamageStat", self.receiveDamageStat
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receive_planeDeath", self.receive_planeDeath
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar",
             "onNewPlayerSpawnedInBattle",
             self.onNewPlayerSpawnedInBattle,
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Vehicle", "receiveDamagesOnShip", self.g_receiveDamagesOnShip
         )
 
@@ -107,11 +114,19 @@ class BattleController(IBattleController):
         self._dict_score: dict[int, Score] = {}
         self._dict_control: dict[int, ControlPoint] = {}
         self._vehicle_to_id: dict[int, int] = {}
-        self._dict_events: dict[int, Events] = {}
+        self._dict_events = EventTimeline(channels)
+        # vehicle states are tracked only along with vehicle events
+        self._vehicle_tracks = (
+            VehicleTracks()
+            if "evt_vehicle" in self._dict_events.channels
+            else None
+        )
         self._version: str = ""
         self._battle_type: int = 0
         self._win_score: int = 1000
         self._packet_time: float = 0.0
+        # events of packets before this time are not recorded
+        self._record_start: float = 0.0
         self._battle_result_nt: BattleResult = BattleResult(-1, -1)
 
         # ACCUMULATORS #
@@ -126,132 +141,138 @@ class BattleController(IBattleController):
 
         #######################################################################
 
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "timeLeft", self._update
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "duration", self._set_durations
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "battleStage", self._set_battle_stage
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "battleResult", self._set_battle_result
         )
-        Entity.subscribe_property_change("Vehicle", "health", self._set_health)
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
+            "Vehicle", "health", self._set_health
+        )
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "isAlive", self._set_is_alive
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "updateMinimapVisionInfo", self._update_position
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "isInvisible", self._set_is_invisible
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar",
             "receiveArtilleryShots",
             self._r_shots,
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receiveTorpedoes", self._receiveTorpedoes
         )
 
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "shipConfig", self._modernization
         )
 
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "crewModifiersCompactParams", self._crew_skills
         )
 
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receiveShotKills", self._set_hits
         )
 
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "visibilityFlags", self._set_visibility_flag
         )
 
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Vehicle",
             "consumableUsed",
             self._on_consumable_used,
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar",
             "receive_addMinimapSquadron",
             self._add_plane,
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar",
             "receive_addMinimapSquadron",
             self._add_plane,
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receive_updateMinimapSquadron", self._update_plane
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receive_removeMinimapSquadron", self._remove_plane
         )
 
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receive_wardAdded", self._add_ward
         )
 
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receive_wardRemoved", self._remove_ward
         )
-        Entity.subscribe_nested_property_change(
+        self._subscriptions.subscribe_nested_property_change(
             "SmokeScreen", "points", self._set_smoke_points
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "state", self._set_state
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "BattleLogic", "battleType", self._set_battle_type
         )
 
-        Entity.subscribe_nested_property_change(
+        self._subscriptions.subscribe_nested_property_change(
             "BattleLogic",
             "state.missions.teamsScore",
             self._set_score,
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "regeneratedHealth", self._set_regenerated_health
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "regenCrewHpLimit", self._set_regen_crew_hp_limit
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "regenerationHealth", self._set_regeneration_health
         )
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_method_call(
             "Avatar", "onChatMessage", self._on_chat_message
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "burningFlags", self._set_burning_flags
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Building", "isSuppressed", self._is_suppressed
         )
-        Entity.subscribe_property_change("Building", "isAlive", self._is_alive)
-        Entity.subscribe_method_call(
+        self._subscriptions.subscribe_property_change(
+            "Building", "isAlive", self._is_alive
+        )
+        self._subscriptions.subscribe_method_call(
             "Avatar", "receiveTorpedoDirection", self._receive_torpedo_dir
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "Vehicle", "maxHealth", self._set_max_health
         )
-        Entity.subscribe_property_change(
+        self._subscriptions.subscribe_property_change(
             "InteractiveZone", "componentsState", self._set_caps
         )
-        Entity.subscribe_nested_property_change(
+        self._subscriptions.subscribe_nested_property_change(
             "InteractiveZone", "componentsState.captureLogic", self._update_caps
         )
-        Entity.subscribe_nested_property_change(
+        self._subscriptions.subscribe_nested_property_change(
             "Avatar", "privateVehicleState.ribbons", self._update_ribbons
         )
 
+        disable_event_channels(self, channels)
+
     ###########################################################################
 
     def _update_caps(self, entity: Entity, cp_l):
@@ -371,6 +392,13 @@ class BattleController(IBattleController):
     def set_packet_time(self, t: float):
         self._packet_time = t
 
+    def set_record_start(self, t: float):
+        """
+        Do not record events of packets before given time,
+        which are played only to restore state of battle
+        """
+        self._record_start = t
+
     def _set_burning_flags(self, entity, flags):
         self._dict_vehicle[entity.id] = self._dict_vehicle[entity.id]._replace(
             burn_flags=flags
@@ -471,29 +499,32 @@ class BattleController(IBattleController):
             return
 
         battle_time = self._durations[-1] - self._time_left
-        evt = Events(
-            time_left=self._time_left,
-            evt_vehicle=copy.copy(self._dict_vehicle),
-            evt_building=copy.copy(self._dict_building),
-            evt_smoke=copy.copy(self._dict_smoke),
-            evt_shot=copy.copy(self._acc_shots),
-            evt_torpedo=copy.copy(self._acc_torpedoes),
-            evt_hits=copy.copy(self._acc_hits),
-            evt_consumable=copy.copy(self._acc_consumables),
-            evt_plane=copy.copy(self._dict_plane),
-            evt_ward=copy.copy(self._dict_ward),
-            evt_control=dict(sorted(self._dict_control.items())),
-            evt_score=copy.copy(self._dict_score),
-            evt_damage_maps=copy.deepcopy(self._damage_maps),
-            evt_frag=copy.copy(self._acc_frags),
-            evt_ribbon=copy.deepcopy(self._ribbons),
-            evt_times_to_win=self._times_to_win(),
-            evt_achievement=copy.deepcopy(self._achievements),
-            evt_chat=copy.deepcopy(self._acc_message),
-            evt_acoustic_torpedo=copy.deepcopy(self._acc_acoustic_torpedoes),
-        )
+        if self._packet_time >= self._record_start:
+            evt = Events(
+                time_left=self._time_left,
+                evt_vehicle=self._dict_vehicle,
+                evt_building=self._dict_building,
+                evt_smoke=self._dict_smoke,
+                evt_shot=self._acc_shots,
+                evt_torpedo=self._acc_torpedoes,
+                evt_hits=self._acc_hits,
+                evt_consumable=self._acc_consumables,
+                evt_plane=self._dict_plane,
+                evt_ward=self._dict_ward,
+                evt_control=dict(sorted(self._dict_control.items())),
+                evt_score=self._dict_score,
+                evt_damage_maps=self._damage_maps,
+                evt_frag=self._acc_frags,
+                evt_ribbon=self._ribbons,
+                evt_times_to_win=self._times_to_win(),
+                evt_achievement=self._achievements,
+                evt_chat=self._acc_message,
+                evt_acoustic_torpedo=self._acc_acoustic_torpedoes,
+            )
 
-        self._dict_events[battle_time] = evt
+            self._dict_events.record(battle_time, evt)
+            if self._vehicle_tracks is not None:
+                self._vehicle_tracks.record(battle_time, self._dict_vehicle)
         self._acc_shots.clear()
         self._acc_torpedoes.clear()
         self._acc_hits.clear()
@@ -659,41 +690,22 @@ class BattleController(IBattleController):
     def _update_position(
         self, entity: Entity, ships_minimap_diff, buildings_minimap_diff
     ):
-        pack_pattern = (
-            (-2500.0, 2500.0, 11),
-            (-2500.0, 2500.0, 11),
-            (-3.141592753589793, 3.141592753589793, 8),
-        )
-        for e in buildings_minimap_diff:
-            vehicle_id = e["vehicleID"]
-            x, y, yaw = unpack_values(e["packedData"], pack_pattern)
-            x, y, yaw = map(round, (x, y, math.degrees(yaw)))
-            is_visible = x != -2500 or y != -2500
-
-            if is_visible:
-                self._dict_building[vehicle_id] = self._dict_building[
-                    vehicle_id
-                ]._replace(x=x, y=y, yaw=yaw, is_visible=is_visible)
-            else:
-                self._dict_building[vehicle_id] = self._dict_building[
-                    vehicle_id
-                ]._replace(is_visible=is_visible)
+        self._apply_minimap_diff(self._dict_building, buildings_minimap_diff)
+        self._apply_minimap_diff(self._dict_vehicle, ships_minimap_diff)
 
-        for e in ships_minimap_diff:
+    @staticmethod
+    def _apply_minimap_diff(items: dict, minimap_diff):
+        for e in minimap_diff:
             vehicle_id = e["vehicleID"]
-            x, y, yaw = unpack_values(e["packedData"], pack_pattern)
-            x, y, yaw = map(round, (x, y, math.degrees(yaw)))
-
-            is_visible = x != -2500 or y != -2500
+            x, y, yaw = unpack_minimap_values(e["packedData"])
+            item = items[vehicle_id]
 
-            if is_visible:
-                self._dict_vehicle[vehicle_id] = self._dict_vehicle[
-                    vehicle_id
-                ]._replace(x=x, y=y, yaw=yaw, is_visible=is_visible)
+            if x != -2500 or y != -2500:
+                items[vehicle_id] = item._replace(
+                    x=x, y=y, yaw=yaw, is_visible=True
+                )
             else:
-                self._dict_vehicle[vehicle_id] = self._dict_vehicle[
-                    vehicle_id
-                ]._replace(is_visible=is_visible)
+                items[vehicle_id] = item._replace(is_visible=False)
 
     def _set_smoke_points(self, entity: Entity, points):
         self._dict_smoke[entity.id] = self._dict_smoke[entity.id]._replace(
@@ -848,33 +860,56 @@ class BattleController(IBattleController):
     def on_player_enter_world(self, entity_id: int):
         self._player_id = entity_id
 
+    def get_replay_data(self) -> ReplayData:
+        """
+        Replay data of current state of battle,
+        events are shared with controller and recorded further
+        """
+        return ReplayData(
+            game_arena_id=self._arena_id,
+            game_version=self._version[:-2].replace(",", "_"),
+            game_map=self._map,
+            game_battle_type=self._battle_type,
+            game_win_score=self._win_score,
+            game_result=self._battle_result_nt,
+            owner_avatar_id=self._owner["avatarId"],
+            owner_vehicle_id=self._owner["shipId"],
+            owner_id=self._owner["id"],
+            player_info=self._dict_info,
+            building_info=self._dict_building_info,
+            events=self._dict_events,
+            vehicle_tracks=self._vehicle_tracks,
+        )
+
     def get_info(self):
         # force copy of last frame to handle subsecond events
         battle_time = self._durations[-1] - self._time_left + 1
         evt = Events(
             time_left=self._time_left,
-            evt_vehicle=copy.copy(self._dict_vehicle),
-            evt_building=copy.copy(self._dict_building),
-            evt_smoke=copy.copy(self._dict_smoke),
-            evt_shot=copy.copy(self._acc_shots),
-            evt_torpedo=copy.copy(self._acc_torpedoes),
-            evt_hits=copy.copy(self._acc_hits),
-            evt_consumable=copy.copy(self._acc_consumables),
-            evt_plane=copy.copy(self._dict_plane),
-            evt_ward=copy.copy(self._dict_ward),
+            evt_vehicle=self._dict_vehicle,
+            evt_building=self._dict_building,
+            evt_smoke=self._dict_smoke,
+            evt_shot=self._acc_shots,
+            evt_torpedo=self._acc_torpedoes,
+            evt_hits=self._acc_hits,
+            evt_consumable=self._acc_consumables,
+            evt_plane=self._dict_plane,
+            evt_ward=self._dict_ward,
             evt_control=dict(sorted(self._dict_control.items())),
-            evt_score=copy.copy(self._dict_score),
-            evt_damage_maps=copy.deepcopy(self._damage_maps),
-            evt_frag=copy.copy(self._acc_frags),
-            evt_ribbon=copy.deepcopy(self._ribbons),
+            evt_score=self._dict_score,
+            evt_damage_maps=self._damage_maps,
+            evt_frag=self._acc_frags,
+            evt_ribbon=self._ribbons,
             evt_times_to_win=self._times_to_win(),
-            evt_achievement=copy.deepcopy(self._achievements),
-            evt_chat=copy.deepcopy(self._acc_message),
-            evt_acoustic_torpedo=copy.deepcopy(self._acc_acoustic_torpedoes),
+            evt_achievement=self._achievements,
+            evt_chat=self._acc_message,
+            evt_acoustic_torpedo=self._acc_acoustic_torpedoes,
             last_frame=True,
         )
 
-        self._dict_events[battle_time] = evt
+        self._dict_events.record(battle_time, evt)
+        if self._vehicle_tracks is not None:
+            self._vehicle_tracks.record(battle_time, self._dict_vehicle)
 
         # adding killed planes data
         players = copy.deepcopy(self._players.get_info())
@@ -883,20 +918,7 @@ class BattleController(IBattleController):
                 player.get("shipId", 0), 0
             )
 
-        rd = ReplayData(
-            game_arena_id=self._arena_id,
-            game_version=self._version[:-2].replace(",", "_"),
-            game_map=self._map,
-            game_battle_type=self._battle_type,
-            game_win_score=self._win_score,
-            game_result=self._battle_result_nt,
-            owner_avatar_id=self._owner["avatarId"],
-            owner_vehicle_id=self._owner["shipId"],
-            owner_id=self._owner["id"],
-            player_info=self._dict_info,
-            building_info=self._dict_building_info,
-            events=self._dict_events,
-        )
+        rd = self.get_replay_data()
 
         return dict(
             achievements=self._achievements,
@@ -3,6 +3,7 @@ from abc import ABCMeta, abstractmethod
 from typing import Dict
 
 from replay_unpack.core.entity import Entity
+from replay_unpack.core.subscriptions import Subscriptions
 
 
 class IBattleController(metaclass=ABCMeta):
@@ -15,6 +16,13 @@ class IBattleController(metaclass=ABCMeta):
     def entities(self) -> Dict[int, Entity]:
         pass
 
+    @property
+    def subscriptions(self) -> Subscriptions:
+        """
+        Subscriptions of this controller, entities of its playback use them
+        """
+        return self._subscriptions
+
     @abstractmethod
     def create_entity(self, entity: Entity) -> None:
         pass
@@ -1,12 +1,92 @@
 # coding=utf-8
 import logging
-from copy import copy
 from enum import Enum
 from io import BytesIO
-from typing import Callable, Dict, List, Tuple
+from typing import Callable, Dict, Set, Tuple
 
 from replay_unpack.core.entity_def import EntityDef
-from replay_unpack.core.entity_def import EntityFlags
+from replay_unpack.core.entity_def.entity_description import VOLATILES
+from replay_unpack.core.subscriptions import Subscriptions
+
+
+class LazyValue:
+    """
+    Encoded property value, which is decoded on first access
+    """
+
+    __slots__ = ("prop", "data")
+
+    def __init__(self, prop, data: bytes):
+        self.prop = prop
+        self.data = data
+
+    def decode(self):
+        return self.prop.create_from_stream(BytesIO(self.data))
+
+
+class PropertiesDict(dict):
+    """
+    Properties of entity, which may contain lazy values,
+    those are decoded and replaced on first access
+    """
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if value.__class__ is LazyValue:
+            value = value.decode()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _decode_all(self):
+        for key, value in dict.items(self):
+            if value.__class__ is LazyValue:
+                dict.__setitem__(self, key, value.decode())
+
+    def values(self):
+        self._decode_all()
+        return dict.values(self)
+
+    def items(self):
+        self._decode_all()
+        return dict.items(self)
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+    def popitem(self):
+        self._decode_all()
+        return dict.popitem(self)
+
+    def copy(self):
+        self._decode_all()
+        return PropertiesDict(self)
+
+    def __eq__(self, other):
+        self._decode_all()
+        return dict.__eq__(self, other)
+
+    __ne__ = dict.__ne__
+
+    def __repr__(self):
+        self._decode_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        self._decode_all()
+        return PropertiesDict, (dict(self),)
 
 
 class Entity:
@@ -19,49 +99,58 @@ class Entity:
         CELL = 2
         BASE = 4
 
-    _methods_subscriptions = {}  # type: Dict[Type, List[Callable]]
-    _properties_subscriptions = {}  # type: Dict[Type, List[Callable]]
-    _nested_properties_subscription = {}
-
-    def __init__(self, id_: int, spec: EntityDef):
+    __slots__ = (
+        "id",
+        "_spec",
+        "_methods",
+        "_subscriptions",
+        "_method_subscriptions",
+        "_property_subscriptions",
+        "_nested_property_subscriptions",
+        "properties",
+        "_volatiles",
+        "client_properties",
+        "client_properties_internal",
+        "cell_properties",
+        "base_properties",
+        "_is_on_aoi",
+    )
+
+    # used by entities created without subscriptions,
+    # prefer subscriptions of battle controller instead
+    _default_subscriptions = Subscriptions()
+
+    def __init__(
+        self, id_: int, spec: EntityDef, subscriptions: Subscriptions = None
+    ):
         self.id = id_
         self._spec = spec
-        self._methods = spec.client().get_exposed_index_map()
+        self._methods = spec.get_client_methods()
+        if subscriptions is None:
+            subscriptions = Entity._default_subscriptions
+        self._subscriptions = subscriptions
 
         # we had to store properties values because network protocol
         # supports updating them partly (lists and dicts)
-        self.properties = {"client": {}, "cell": {}, "base": {}}
-
-        # position, yaw, pitch, roll
-        self.volatiles = copy(spec.volatiles())
-
-        self.client_properties = spec.properties().get_properties_by_flags(
-            EntityFlags.ALL_CLIENTS
-            | EntityFlags.BASE_AND_CLIENT
-            | EntityFlags.OTHER_CLIENTS
-            | EntityFlags.OWN_CLIENT
-            | EntityFlags.CELL_PUBLIC_AND_OWN
-            | EntityFlags.ALL_CLIENTS,
-            exposed_index=True,
-        )
-        self.client_properties_internal = spec.properties().get_properties_by_flags(
-            EntityFlags.ALL_CLIENTS
-            |
-            # not used for some reason
-            # EntityFlags.BASE_AND_CLIENT |
-            EntityFlags.OTHER_CLIENTS
-            | EntityFlags.OWN_CLIENT
-            | EntityFlags.CELL_PUBLIC_AND_OWN
-            | EntityFlags.ALL_CLIENTS
+        self.properties = {"client": PropertiesDict(), "cell": {}, "base": {}}
+
+        # position, yaw, pitch, roll, None for volatiles entity does not have
+        self._volatiles = list(spec.get_volatile_defaults())
+
+        # property tables are shared by all entities of the same type
+        self.client_properties = spec.get_client_properties()
+        self.client_properties_internal = spec.get_client_properties_internal()
+        self.cell_properties = spec.get_cell_properties()
+        self.base_properties = spec.get_base_properties()
+
+        self._method_subscriptions = subscriptions.get_method_table(
+            spec.get_name(), self._methods
         )
-        self.cell_properties = spec.properties().get_properties_by_flags(
-            EntityFlags.CELL_PUBLIC_AND_OWN
-            | EntityFlags.CELL_PUBLIC
-            # | EntityFlags.CELL_PRIVATE
+        self._property_subscriptions = subscriptions.get_property_table(
+            spec.get_name(), self.client_properties
         )
-        self.base_properties = spec.properties().get_properties_by_flags(
-            # EntityFlags.BASE |
-            EntityFlags.BASE_AND_CLIENT
+        self._nested_property_subscriptions = subscriptions.get_nested_property_tree(
+            spec.get_name()
         )
 
         self._is_on_aoi = True
@@ -79,12 +168,10 @@ class Entity:
         cls, entity_name: str, method_name: str, func: Callable
     ):
         """
-        Add callbacks that should be triggered when given method called
+        Deprecated, use Subscriptions of battle controller instead
         """
-        if method_name not in cls._methods_subscriptions:
-            cls._methods_subscriptions[entity_name + "_" + method_name] = []
-        cls._methods_subscriptions[entity_name + "_" + method_name].append(
-            func
+        cls._default_subscriptions.subscribe_method_call(
+            entity_name, method_name, func
         )
 
     @classmethod
@@ -92,21 +179,29 @@ class Entity:
         cls, entity_name: str, prop_name: str, func: Callable
     ):
         """
-        Add callbacks that should be triggered when given method called
+        Deprecated, use Subscriptions of battle controller instead
+        """
+        cls._default_subscriptions.subscribe_property_change(
+            entity_name, prop_name, func
+        )
+
+    def get_subscribed_methods(self) -> Set[int]:
+        """
+        Exposed indices of client methods which have subscribers,
+        calls of other methods may be skipped without reading them
         """
-        prop_hash = entity_name + "_" + prop_name
-        if prop_name not in cls._properties_subscriptions:
-            cls._properties_subscriptions[prop_hash] = []
-        cls._properties_subscriptions[prop_hash].append(func)
+        return {
+            exposed_index
+            for exposed_index, funcs in enumerate(self._method_subscriptions)
+            if funcs
+        }
+
+    def get_client_method_name(self, exposed_index: int) -> str:
+        return self._methods[exposed_index].get_name()
 
     def call_client_method(self, exposed_index: int, payload: BytesIO):
         method = self._methods[exposed_index]
-        logging.debug("calling %s method %s", self._spec.get_name(), method)
-        method_hash = self._spec.get_name() + "_" + method.get_name()
-        # print(method_hash)
-        subscriptions = Entity._methods_subscriptions.get(method_hash, [])
-        # if method.get_name() not in ["onCheckGamePing", "onCheckCellPing"]:
-        #     print(method_hash)
+        subscriptions = self._method_subscriptions[exposed_index]
         if not subscriptions:
             return
 
@@ -125,24 +220,32 @@ class Entity:
                 )
                 raise
 
-    def set_client_property(self, exposed_index, payload: BytesIO):
-        logging.debug(
-            "requested property %s of entity %s",
-            exposed_index,
-            self._spec.get_name(),
-        )
+    def set_client_property(
+        self, exposed_index, payload: BytesIO, single_value=False
+    ):
+        """
+        Set client property from payload,
+        use single_value=True if payload contains only this value;
+        Values nobody is subscribed to are decoded on first access
+        """
         prop = self.client_properties[exposed_index]
-        logging.debug(
-            "setting %s client property %s", self._spec.get_name(), prop
-        )
+        subscriptions = self._property_subscriptions[exposed_index]
+        if not subscriptions:
+            if prop.is_fixed_size():
+                data = payload.read(prop.get_size_in_bytes())
+            elif single_value:
+                data = payload.read()
+            else:
+                # size of value is known only after decoding
+                self.properties["client"][prop.get_name()] = prop.create_from_stream(
+                    payload
+                )
+                return
+            self.properties["client"][prop.get_name()] = LazyValue(prop, data)
+            return
 
         value = prop.create_from_stream(payload)
         self.properties["client"][prop.get_name()] = value
-        prop_hash = f"{self._spec.get_name()}_{prop.get_name()}"
-        subscriptions = Entity._properties_subscriptions.get(prop_hash, [])
-
-        if not subscriptions:
-            return
         for func in subscriptions:
             try:
                 func(self, value)
@@ -153,48 +256,34 @@ class Entity:
     def subscribe_nested_property_change(
         cls, entity_name: str, prop_path: str, func: Callable
     ):
-
-        prop_hash = entity_name + "_" + prop_path
-        if prop_path not in cls._nested_properties_subscription:
-            cls._nested_properties_subscription[prop_hash] = []
-        cls._nested_properties_subscription[prop_hash].append(func)
+        """
+        Deprecated, use Subscriptions of battle controller instead
+        """
+        cls._default_subscriptions.subscribe_nested_property_change(
+            entity_name, prop_path, func
+        )
 
     def set_client_nested_property(self, prop_path: list, obj):
-        prop_hash = f"{self.get_name()}_{'.'.join(map(str, prop_path))}"
-
-        for phash, funcs in Entity._nested_properties_subscription.items():
-            if phash in prop_hash:
-                for func in funcs:
-                    func(self, obj)
+        tree = self._nested_property_subscriptions
+        if not tree.children:
+            return
+        for func in tree.iter_callbacks(prop_path):
+            func(self, obj)
 
     def set_client_property_internal(self, internal_index, payload: BytesIO):
-        logging.debug(
-            "requested property %s of entity %s",
-            internal_index,
-            self._spec.get_name(),
-        )
         prop = self.client_properties_internal[internal_index]
-        logging.debug(
-            "setting %s client property %s", self._spec.get_name(), prop
-        )
         self.properties["client"][prop.get_name()] = prop.create_from_stream(
             payload
         )
 
     def set_cell_property(self, internal_index, payload: BytesIO):
         prop = self.cell_properties[internal_index]
-        logging.debug(
-            "setting %s cell property %s", self._spec.get_name(), prop
-        )
         self.properties["cell"][prop.get_name()] = prop.create_from_stream(
             payload
         )
 
     def set_base_property(self, internal_index, payload: BytesIO):
         prop = self.base_properties[internal_index]
-        logging.debug(
-            "setting %s base property %s", self._spec.get_name(), prop
-        )
         self.properties["base"][prop.get_name()] = prop.create_from_stream(
             payload
         )
@@ -203,60 +292,59 @@ class Entity:
         return self._spec.get_name()
 
     @property
-    def position(self) -> Tuple[float, float, float]:
-        try:
-            return self.volatiles["position"]
-        except KeyError:
+    def volatiles(self) -> Dict[str, object]:
+        return {
+            name: value
+            for name, value in zip(VOLATILES, self._volatiles)
+            if value is not None
+        }
+
+    def set_volatiles(self, position, yaw, pitch, roll):
+        """
+        Set all volatile values at once
+        """
+        self._volatiles[:] = position, yaw, pitch, roll
+
+    def _get_volatile(self, index: int):
+        value = self._volatiles[index]
+        if value is None:
             raise RuntimeError(
                 "Entity %s does not have volatile %s"
-                % (self.get_name(), "position")
+                % (self.get_name(), VOLATILES[index])
             )
+        return value
+
+    @property
+    def position(self) -> Tuple[float, float, float]:
+        return self._get_volatile(0)
 
     @position.setter
     def position(self, value: Tuple[float, float, float]):
-        self.volatiles["position"] = value
+        self._volatiles[0] = value
 
     @property
     def yaw(self) -> float:
-        try:
-            return self.volatiles["yaw"]
-        except KeyError:
-            raise RuntimeError(
-                "Entity %s does not have volatile %s"
-                % (self.get_name(), "yaw")
-            )
+        return self._get_volatile(1)
 
     @yaw.setter
     def yaw(self, value: float):
-        self.volatiles["yaw"] = value
+        self._volatiles[1] = value
 
     @property
     def pitch(self) -> float:
-        try:
-            return self.volatiles["pitch"]
-        except KeyError:
-            raise RuntimeError(
-                "Entity %s does not have volatile %s"
-                % (self.get_name(), "pitch")
-            )
+        return self._get_volatile(2)
 
     @pitch.setter
     def pitch(self, value: float):
-        self.volatiles["pitch"] = value
+        self._volatiles[2] = value
 
     @property
     def roll(self) -> float:
-        try:
-            return self.volatiles["roll"]
-        except KeyError:
-            raise RuntimeError(
-                "Entity %s does not have volatile %s"
-                % (self.get_name(), "roll")
-            )
+        return self._get_volatile(3)
 
     @roll.setter
     def roll(self, value: float):
-        self.volatiles["roll"] = value
+        self._volatiles[3] = value
 
     def __repr__(self):
         return "{}<{}>".format(self._spec.get_name(), self.id)
@@ -19,6 +19,12 @@ class BaseDataObjectDef:
         self._alias = alias
         self._base_dir = base_dir
 
+    def __getstate__(self):
+        # alias is needed for parsing only and is shared by all definitions
+        state = self.__dict__.copy()
+        state['_alias'] = None
+        return state
+
     def _parse_implements(self, implements_list: etree.ElementBase):
         """
         This method parses a data section for the properties and methods associated
@@ -79,12 +85,16 @@ class Property:
         self._type = type_
         self._default = type_.get_default_value(default)
         self._flags = getattr(EntityFlags, flags)
+        self._size = min(type_.get_size_in_bytes(), INFINITY)
 
     def get_name(self):
         return self._name
 
     def get_size_in_bytes(self):
-        return min(self._type.get_size_in_bytes(), INFINITY)
+        return self._size
+
+    def is_fixed_size(self) -> bool:
+        return self._size < INFINITY
 
     def get_default_value(self):
         return self._default
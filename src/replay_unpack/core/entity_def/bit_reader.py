@@ -1,22 +1,26 @@
 # coding=utf-8
-from io import BytesIO
 from math import ceil, log
-from typing import Iterable
 
 
 class BitReader(object):
     """
-    Allows us to read bytes object bit-by-bit
+    Allows us to read bytes object bit-by-bit,
+    bits are taken from the most significant one
     """
 
     def __init__(self, stream):
         # TODO: leave only one type here
-        if isinstance(stream, bytes):
-            self._stream = BytesIO(stream)
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            data = bytes(stream)
         else:
-            self._stream = stream
-
-        self._bits_cache = []
+            data = stream.read()
+
+        self._data = data
+        # whole payload as one big-endian number
+        self._value = int.from_bytes(data, 'big')
+        self._size_bits = len(data) * 8
+        # bits which still may be read, see get_rest
+        self._available_bits = self._size_bits
         self._read_bits = 0
 
     @staticmethod
@@ -27,41 +31,27 @@ class BitReader(object):
 
     @property
     def bytes_read(self) -> int:
-        return int(ceil(self._read_bits / 8.0))
+        return (self._read_bits + 7) // 8
 
     def get_rest(self) -> bytes:
-        return self._stream.read()
-
-    def _iter_string_bits(self, string) -> Iterable[bool]:
-        for b in string:
-            for i in reversed(range(8)):
-                yield (b >> i) & 1  # 0b00..[0|1]
-
-    def _get_next_byte(self) -> bytes:
-        next_byte = self._stream.read(1)
-        if next_byte == '':
-            raise Exception('I am empty %s' % self._read_bits)
-        return next_byte
-
-    def _get_next_bit(self):
-        if not self._bits_cache:
-            next_byte = self._get_next_byte()
-            self._bits_cache = list(
-                self._iter_string_bits(next_byte))
-
-        self._read_bits += 1
-        try:
-            return self._bits_cache.pop(0)
-        except IndexError:
-            raise Exception('I am empty %s' % self._read_bits)
+        """
+        Get bytes following partially read one,
+        only rest of that byte can be read after this
+        """
+        if self._available_bits != self._size_bits:
+            # rest is already taken
+            return b''
+        self._available_bits = self.bytes_read * 8
+        return self._data[self.bytes_read:]
 
     def get(self, nbits) -> int:
         if nbits == 0:
             return 0
 
-        value = 0
-        while nbits > 0:
-            bit = self._get_next_bit()
-            value = (value << 1) | bit  # add bit to number
-            nbits -= 1
-        return value
+        end = self._read_bits + nbits
+        if end > self._available_bits:
+            self._read_bits = self._available_bits + 1
+            raise Exception('I am empty %s' % self._read_bits)
+
+        self._read_bits = end
+        return (self._value >> (self._size_bits - end)) & ((1 << nbits) - 1)
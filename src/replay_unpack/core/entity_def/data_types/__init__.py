@@ -1,6 +1,6 @@
 # coding=utf-8
 import os
-from typing import Dict
+from typing import Dict, Tuple
 
 from lxml import etree
 
@@ -61,7 +61,8 @@ class Alias:
     }
 
     def __init__(self, base_dir: str):
-        self._mapping: Dict[str, DataType] = {}
+        # types of aliases are created on first use
+        self._mapping: Dict[Tuple[str, int], DataType] = {}
         self._alias: Dict[str, etree.ElementBase] = {}
         self._initialize(base_dir)
 
@@ -69,12 +70,27 @@ class Alias:
         type_name = section.text.strip()
 
         if type_name in self._alias:
-            return self.get_data_type_from_section(self._alias[type_name], header_size)
+            try:
+                return self._mapping[type_name, header_size]
+            except KeyError:
+                _type = self._mapping[type_name, header_size] = \
+                    self.get_data_type_from_section(self._alias[type_name], header_size)
+                return _type
         elif type_name in self.SIMPLE_TYPES:
             return self.SIMPLE_TYPES[type_name].from_section(self, section, header_size)
         else:
             raise RuntimeError("%s is unknown" % type_name)
 
+    def __getstate__(self):
+        # xml sections can't be pickled, store them as text
+        state = self.__dict__.copy()
+        state['_alias'] = {key: etree.tostring(section) for key, section in self._alias.items()}
+        return state
+
+    def __setstate__(self, state):
+        state['_alias'] = {key: etree.fromstring(section) for key, section in state['_alias'].items()}
+        self.__dict__.update(state)
+
     def _initialize(self, base_dir):
         alias_path = os.path.join(base_dir, 'scripts/entity_defs/alias.xml')
         if not os.path.exists(alias_path):
@@ -85,7 +101,3 @@ class Alias:
                 remove_comments=True))
             for item in xml.getroot():
                 self._alias[item.tag] = item
-
-        for key, section in self._alias.items():
-            _type = self.get_data_type_from_section(section)
-            self._mapping[key] = _type
@@ -1,9 +1,28 @@
 # coding=utf-8
 import logging
 from io import BytesIO
+from typing import Any, Callable, Optional, Tuple
 
 from lxml import etree
 
+# compiled decoder, reads value from buffer at given offset,
+# returns value and offset right after it
+Decoder = Callable[[bytes, int], Tuple[Any, int]]
+
+# struct format of fixed-size value and function creating value
+# from its unpacked items, None if value is plain struct value
+RowDecoder = Tuple[str, Optional[Callable[[tuple], Any]]]
+
+
+def decode_stream(decoder: Decoder, stream: BytesIO):
+    """
+    Decode value at current position of stream without copying its data
+    """
+    buffer = stream.getvalue()
+    value, offset = decoder(buffer, stream.tell())
+    stream.seek(min(offset, len(buffer)))
+    return value
+
 
 class DataType:
     DEFAULT_VALUE = None
@@ -12,6 +31,7 @@ class DataType:
     def __init__(self, header_size=1):
         self._nullable = False
         self._header_size = header_size
+        self._decoders = {}
 
         assert self.get_size_in_bytes() is not None, \
             "You must define DATA_SIZE variable " \
@@ -30,9 +50,52 @@ class DataType:
         logging.debug('Parsing default value for %s', self.__class__.__name__)
         return self._get_default_value_from_section(default)
 
+    def __getstate__(self):
+        # compiled decoders are closures, which can't be pickled
+        state = self.__dict__.copy()
+        state['_decoders'] = {}
+        return state
+
     def create_from_stream(self, stream: BytesIO, header_size: int = 1):
+        if isinstance(stream, BytesIO):
+            return decode_stream(self.get_decoder(header_size), stream)
         return self._get_value_from_stream(stream, header_size)
 
+    def get_decoder(self, header_size: int = 1) -> Decoder:
+        """
+        Get decoder compiled for this type and header size,
+        its result is same as of create_from_stream
+        """
+        try:
+            return self._decoders[header_size]
+        except KeyError:
+            decoder = self._decoders[header_size] = self._compile_decoder(header_size)
+            return decoder
+
+    def _compile_decoder(self, header_size: int) -> Decoder:
+        def decode(buffer, offset):
+            stream = BytesIO(buffer)
+            stream.seek(offset)
+            return self._get_value_from_stream(stream, header_size), stream.tell()
+
+        return decode
+
+    def get_struct_format(self) -> Optional[str]:
+        """
+        Format of this type for struct module if it is fixed-size plain value
+        """
+        return None
+
+    def get_row_decoder(self) -> Optional[RowDecoder]:
+        """
+        Decoder of fixed-size value from items unpacked by struct module,
+        allows to unpack many values at once
+        """
+        fmt = self.get_struct_format()
+        if fmt is None:
+            return None
+        return fmt, None
+
     def _get_value_from_stream(self, stream: BytesIO, header_size: int):
         raise NotImplementedError()
 
@@ -19,6 +19,18 @@ class _MathType(DataType):
         return tuple(struct.unpack(
             self.STRUCT_TYPE, stream.read(self._DATA_SIZE)))
 
+    def _compile_decoder(self, header_size: int):
+        unpack_from = struct.Struct('=' + self.STRUCT_TYPE).unpack_from
+        size = self._DATA_SIZE
+
+        def decode(buffer, offset):
+            return unpack_from(buffer, offset), offset + size
+
+        return decode
+
+    def get_struct_format(self):
+        return self.STRUCT_TYPE
+
     def _get_default_value_from_section(self, value: Element):
         raise RuntimeError("_get_default_value_from_section for %s is not defined" % self.__class__.__name__)
 
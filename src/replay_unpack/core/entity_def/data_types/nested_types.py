@@ -3,22 +3,108 @@
 Dirty hack to simplify nested property and slices
 Override list and dict types to store information about types
 """
+from collections.abc import MutableMapping
+from copy import deepcopy
 
+# value of field which was deleted or was not set yet
+_MISSING = object()
 
-class PyFixedDict(dict):
+
+class FixedDictSchema:
     """
-    Emulate BigWorld type PyFixedDict
+    Field names and types of FixedDict, shared by all its values
     """
 
-    def __init__(self, attributes, *args, **kwargs):
-        self._attributes = attributes
-        super(PyFixedDict, self).__init__(*args, **kwargs)
+    __slots__ = ("names", "types", "indices")
+
+    def __init__(self, attributes):
+        self.names = tuple(attributes.keys())
+        self.types = tuple(attributes.values())
+        self.indices = {name: index for index, name in enumerate(self.names)}
+
+
+class PyFixedDict(MutableMapping):
+    """
+    Emulate BigWorld type PyFixedDict,
+    values are stored in order of schema fields
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, schema: FixedDictSchema, *args, **kwargs):
+        self._schema = schema
+        self._values = [_MISSING] * len(schema.names)
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    @classmethod
+    def from_values(cls, schema: FixedDictSchema, values: list) -> "PyFixedDict":
+        """
+        Create dict from values of all fields in order of schema
+        """
+        # object.__new__ is much faster than inherited __new__ lookup
+        obj = object.__new__(cls)
+        obj._schema = schema
+        obj._values = values
+        return obj
 
     def get_field_name_for_index(self, index):
-        return list(self._attributes.keys())[index]
+        return self._schema.names[index]
 
     def get_field_type_for_index(self, index):
-        return list(self._attributes.values())[index]
+        return self._schema.types[index]
+
+    def __getitem__(self, key):
+        value = self._values[self._schema.indices[key]]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        index = self._schema.indices.get(key)
+        if index is None:
+            return default
+        value = self._values[index]
+        return default if value is _MISSING else value
+
+    def __setitem__(self, key, value):
+        try:
+            self._values[self._schema.indices[key]] = value
+        except KeyError:
+            raise KeyError("%r is not a field of fixed dict" % (key,)) from None
+
+    def __delitem__(self, key):
+        index = self._schema.indices[key]
+        if self._values[index] is _MISSING:
+            raise KeyError(key)
+        self._values[index] = _MISSING
+
+    def __contains__(self, key):
+        index = self._schema.indices.get(key)
+        return index is not None and self._values[index] is not _MISSING
+
+    def __iter__(self):
+        for name, value in zip(self._schema.names, self._values):
+            if value is not _MISSING:
+                yield name
+
+    def __len__(self):
+        return sum(1 for value in self._values if value is not _MISSING)
+
+    def copy(self):
+        return self.from_values(self._schema, self._values[:])
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        memo[id(_MISSING)] = _MISSING
+        return self.from_values(self._schema, deepcopy(self._values, memo))
+
+    def __reduce__(self):
+        return PyFixedDict, (self._schema, dict(self.items()))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
 
 
 # TODO: hardcoded list len
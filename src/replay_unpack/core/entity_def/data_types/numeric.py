@@ -19,6 +19,18 @@ class _NumericType(DataType):
     def _get_value_from_stream(self, stream: BytesIO, header_size: int):
         return struct.unpack(self.STRUCT_TYPE, stream.read(self._DATA_SIZE))[0]
 
+    def _compile_decoder(self, header_size: int):
+        unpack_from = struct.Struct('=' + self.STRUCT_TYPE).unpack_from
+        size = self._DATA_SIZE
+
+        def decode(buffer, offset):
+            return unpack_from(buffer, offset)[0], offset + size
+
+        return decode
+
+    def get_struct_format(self):
+        return self.STRUCT_TYPE
+
     def _get_default_value_from_section(self, section: etree.ElementBase):
         return self.PYTHON_TYPE(section.text.strip())
 
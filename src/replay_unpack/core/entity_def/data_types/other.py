@@ -1,18 +1,82 @@
 # coding=utf-8
 import logging
+import struct
 from collections import OrderedDict
 from io import BytesIO
+from operator import itemgetter
 from struct import unpack
-from typing import Iterable, Dict
+from typing import Iterable, Dict, List, Optional
 
 from lxml import etree
 
-from .base import DataType
+from .base import DataType, Decoder, RowDecoder
 from .constants import INFINITY
-from .nested_types import PyFixedDict, PyFixedList
+from .nested_types import FixedDictSchema, PyFixedDict, PyFixedList
 from .numeric import UInt8
 
 
+_unpack_uint8 = struct.Struct('B').unpack_from
+# size of long blobs and strings, followed by unknown byte
+_unpack_long_size = struct.Struct('=HB').unpack_from
+
+
+def _decode_sized(buffer: bytes, offset: int):
+    """
+    Decode bytes prefixed with size, see Blob
+    """
+    size, = _unpack_uint8(buffer, offset)
+    offset += 1
+    # hack for arenaStateReceived
+    if size == 0xff:
+        size, _ = _unpack_long_size(buffer, offset)
+        offset += 3
+    return buffer[offset:offset + size], offset + size
+
+
+def _compile_struct_step(formats: List[str]):
+    """
+    Compile decoding of consecutive fixed-size fields of FixedDict
+    into single struct unpack, which appends field values to list
+    """
+    compiled = struct.Struct('=' + ''.join(formats))
+    unpack_from = compiled.unpack_from
+    size = compiled.size
+
+    if all(len(fmt) == 1 for fmt in formats):
+        def step(values, buffer, offset):
+            values.extend(unpack_from(buffer, offset))
+            return offset + size
+
+        return step
+
+    # vectors are stored as tuples
+    slices = []
+    index = 0
+    for fmt in formats:
+        if len(fmt) == 1:
+            slices.append((index, None))
+        else:
+            slices.append((index, index + len(fmt)))
+        index += len(fmt)
+
+    def step(values, buffer, offset):
+        unpacked = unpack_from(buffer, offset)
+        for start, end in slices:
+            values.append(unpacked[start] if end is None else unpacked[start:end])
+        return offset + size
+
+    return step
+
+
+def _compile_field_step(decoder: Decoder):
+    def step(values, buffer, offset):
+        value, offset = decoder(buffer, offset)
+        values.append(value)
+        return offset
+
+    return step
+
+
 class _DataType(DataType):
 
     def _get_value_from_stream(self, stream: BytesIO, header_size):
@@ -44,6 +108,9 @@ class Blob(_DataType):
             return stream.read(size)
         return stream.read(size)
 
+    def _compile_decoder(self, header_size: int):
+        return _decode_sized
+
 
 class String(_DataType):
     """
@@ -72,6 +139,16 @@ class String(_DataType):
             # probably this is a pickle string or smtg like that
             return _str
 
+    def _compile_decoder(self, header_size: int):
+        def decode(buffer, offset):
+            _str, offset = _decode_sized(buffer, offset)
+            try:
+                return _str.decode('utf-8'), offset
+            except UnicodeDecodeError:
+                return _str, offset
+
+        return decode
+
     def _get_default_value_from_section(self, section: etree.ElementBase):
         assert isinstance(section.text, str)
         return section.text
@@ -92,12 +169,21 @@ class Python(_DataType):
         size, = unpack('B', stream.read(1))
         return stream.read(size)
 
+    def _compile_decoder(self, header_size: int):
+        def decode(buffer, offset):
+            size, = _unpack_uint8(buffer, offset)
+            offset += 1
+            return buffer[offset:offset + size], offset + size
+
+        return decode
+
 
 class FixedDict(_DataType):
 
     def __init__(self, attributes: Dict[str, DataType], allow_none=False, header_size=1):
         self.allow_none = allow_none
         self.attributes = attributes  # type: OrderedDict
+        self.schema = FixedDictSchema(attributes)
         super(FixedDict, self).__init__(header_size=header_size)
 
     def _get_value_from_stream(self, stream: BytesIO, header_size: int):
@@ -116,10 +202,89 @@ class FixedDict(_DataType):
             else:
                 stream.seek(stream_pos)
 
-        kw = PyFixedDict(self.attributes)
-        for key, _type in self.attributes.items():
-            kw[key] = _type.create_from_stream(stream, header_size=header_size)
-        return kw
+        return PyFixedDict.from_values(self.schema, [
+            _type.create_from_stream(stream, header_size=header_size)
+            for _type in self.schema.types
+        ])
+
+    def _compile_decoder(self, header_size: int):
+        steps = []
+        fixed_formats = []
+        for _type in self.schema.types:
+            fmt = _type.get_struct_format()
+            if fmt is not None:
+                fixed_formats.append(fmt)
+                continue
+            if fixed_formats:
+                steps.append(_compile_struct_step(fixed_formats))
+                fixed_formats = []
+            steps.append(_compile_field_step(_type.get_decoder(header_size)))
+        if fixed_formats:
+            steps.append(_compile_struct_step(fixed_formats))
+
+        schema = self.schema
+        from_values = PyFixedDict.from_values
+        allow_none = self.allow_none
+
+        def decode(buffer, offset):
+            if allow_none:
+                flag = buffer[offset:offset + 1]
+                if flag == b'\x00':
+                    return None, offset + 1
+                elif flag == b'\x01':
+                    offset += 1
+
+            values = []
+            for step in steps:
+                offset = step(values, buffer, offset)
+            return from_values(schema, values), offset
+
+        return decode
+
+    def get_row_decoder(self) -> Optional[RowDecoder]:
+        if self.allow_none:
+            return None
+
+        formats = []
+        # items of every field, vectors are sliced as tuples
+        keys = []
+        # fields which values are created from their items
+        converts = []
+        index = 0
+        for position, _type in enumerate(self.schema.types):
+            row_decoder = _type.get_row_decoder()
+            if row_decoder is None:
+                return None
+            fmt, convert = row_decoder
+            formats.append(fmt)
+            if len(fmt) == 1 and convert is None:
+                keys.append(index)
+            else:
+                keys.append(slice(index, index + len(fmt)))
+            if convert is not None:
+                converts.append((position, convert))
+            index += len(fmt)
+
+        schema = self.schema
+        from_values = PyFixedDict.from_values
+
+        if not converts and all(isinstance(key, int) for key in keys):
+            # every item is value of field
+            return ''.join(formats), lambda items: from_values(schema, list(items))
+
+        if len(keys) == 1:
+            key = keys[0]
+            get_items = lambda items: [items[key]]
+        else:
+            get_items = itemgetter(*keys)
+
+        def convert(items):
+            values = list(get_items(items))
+            for position, field_convert in converts:
+                values[position] = field_convert(values[position])
+            return from_values(schema, values)
+
+        return ''.join(formats), convert
 
     @classmethod
     def from_section(cls, alias, section: etree.ElementBase, header_size=1):
@@ -156,17 +321,86 @@ class Array(_DataType):
         super(Array, self).__init__(header_size=header_size)
 
     def _get_value_from_stream(self, stream: BytesIO, header_size: int):
-        result = PyFixedList(self.type)
-
         size = self.array_size
         if self.array_size is None:
             size = UInt8(header_size=header_size). \
                 create_from_stream(stream, header_size=header_size)
 
+        if self.type.get_row_decoder() is not None:
+            # fixed-size elements are read at once
+            data = stream.read(size * self.type.get_size_in_bytes())
+            if self.array_size is None:
+                data = bytes((size,)) + data
+            return self.get_decoder(header_size)(data, 0)[0]
+
+        result = PyFixedList(self.type)
         for _ in range(size):
             result.append(self.type.create_from_stream(stream, header_size=header_size))
         return result
 
+    def _compile_decoder(self, header_size: int):
+        element_type = self.type
+        array_size = self.array_size
+        fmt = element_type.get_struct_format()
+        row_decoder = element_type.get_row_decoder()
+
+        if row_decoder is None:
+            element_decoder = element_type.get_decoder(header_size)
+
+            def decode(buffer, offset):
+                size = array_size
+                if size is None:
+                    size, = _unpack_uint8(buffer, offset)
+                    offset += 1
+
+                result = PyFixedList(element_type)
+                for _ in range(size):
+                    value, offset = element_decoder(buffer, offset)
+                    result.append(value)
+                return result, offset
+
+            return decode
+
+        if fmt is None or len(fmt) != 1:
+            # fixed-size structs and vectors are unpacked element by element
+            # in one pass over whole array
+            row_fmt, convert = row_decoder
+            element_struct = struct.Struct('=' + row_fmt)
+            iter_unpack = element_struct.iter_unpack
+            element_size = element_struct.size
+
+            def decode(buffer, offset):
+                size = array_size
+                if size is None:
+                    size, = _unpack_uint8(buffer, offset)
+                    offset += 1
+
+                end = offset + size * element_size
+                rows = iter_unpack(buffer[offset:end])
+                if convert is not None:
+                    rows = map(convert, rows)
+                return PyFixedList(element_type, rows), end
+
+            return decode
+
+        # fixed-size numbers are unpacked at once
+        structs = {}
+
+        def decode(buffer, offset):
+            size = array_size
+            if size is None:
+                size, = _unpack_uint8(buffer, offset)
+                offset += 1
+
+            try:
+                compiled = structs[size]
+            except KeyError:
+                compiled = structs[size] = struct.Struct('=' + fmt * size)
+            values = compiled.unpack_from(buffer, offset)
+            return PyFixedList(element_type, values), offset + compiled.size
+
+        return decode
+
     @classmethod
     def from_section(cls, alias, section: etree.ElementBase, header_size):
         child_type = alias.get_data_type_from_section(
@@ -221,6 +455,16 @@ class UserType(_DataType):
             stream.read(header_size)
         return self.type.create_from_stream(stream, header_size=header_size)
 
+    def _compile_decoder(self, header_size: int):
+        decoder = self.type.get_decoder(header_size)
+        if isinstance(self.type, Blob):
+            return decoder
+
+        def decode(buffer, offset):
+            return decoder(buffer, offset + header_size)
+
+        return decode
+
     @classmethod
     def from_section(cls, alias, section: etree.ElementBase, header_size):
         type_section = section.find('Type')
@@ -240,5 +484,11 @@ class Mailbox(_DataType):
     def _get_value_from_stream(self, stream: BytesIO, header_size: int):
         pass
 
+    def _compile_decoder(self, header_size: int):
+        def decode(buffer, offset):
+            return None, offset
+
+        return decode
+
     def __repr__(self):
         return "<Mailbox>".format()
@@ -1,6 +1,10 @@
 # coding=utf-8
+import hashlib
+import logging
 import os
-from typing import Dict
+import pickle
+import tempfile
+from typing import Dict, List, Optional
 
 from lxml import etree
 
@@ -8,33 +12,106 @@ from .constants import ENTITIES_DEFS_PATH
 from .data_types import Alias
 from .entity_description import EntityDef
 
+# bump when layout of compiled definitions changes,
+# so previously cached definitions are not loaded anymore
+CACHE_FORMAT_VERSION = 6
+
+
+def get_scripts_hash(base_dir: str) -> str:
+    """
+    Hash of all files in scripts dir of given version
+    """
+    scripts_dir = os.path.join(base_dir, 'scripts')
+    digest = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode())
+    for root, dirs, files in os.walk(scripts_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, scripts_dir).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
 
 class Definitions:
-    def __init__(self, base_dir):
+    """
+    Entity definitions of game version,
+    every entity is parsed on first request
+    """
+
+    def __init__(self, base_dir, cache_dir: Optional[str] = None):
+        self._base_dir = base_dir
+        self._cache_dir = cache_dir
         self._alias = Alias(base_dir)
 
         self._entity_defs_by_name: Dict[str, EntityDef] = {}
-        self._entity_defs_by_index: Dict[int, EntityDef] = {}
+        # in order of entities.xml
+        self._entity_names: List[str] = []
         self._parse(base_dir)
 
-    def get_entity_def_by_name(self, name):
-        return self._entity_defs_by_name[name]
+    @classmethod
+    def load(cls, base_dir: str, cache_dir: Optional[str] = None) -> 'Definitions':
+        """
+        Get definitions of given version,
+        parsed entities are stored in cache_dir keyed by hash
+        of version scripts, so xml of entity is parsed once per version
+        """
+        if cache_dir is None or not os.path.isdir(os.path.join(base_dir, 'scripts')):
+            return cls(base_dir)
 
-    def get_entity_def_by_index(self, index):
+        return cls(base_dir, os.path.join(cache_dir, '%s-%s' % (
+            os.path.basename(os.path.normpath(base_dir)), get_scripts_hash(base_dir))))
+
+    def get_entity_def_by_name(self, name) -> EntityDef:
+        try:
+            return self._entity_defs_by_name[name]
+        except KeyError:
+            if name not in self._entity_names:
+                raise
+        entity_def = self._entity_defs_by_name[name] = self._load_entity_def(name)
+        return entity_def
+
+    def get_entity_def_by_index(self, index) -> EntityDef:
         # bigworld counts entities from 1
-        return self._entity_defs_by_index[index - 1]
+        if not 0 < index <= len(self._entity_names):
+            raise KeyError(index)
+        return self.get_entity_def_by_name(self._entity_names[index - 1])
+
+    def _load_entity_def(self, name: str) -> EntityDef:
+        if self._cache_dir is None:
+            return self._parse_entity_def(name)
+
+        path = os.path.join(self._cache_dir, name + '.pickle')
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning("Failed to load cached definition %s: %s", path, e)
 
-    def _parse_entities(self, base_dir: str, entities: etree.ElementBase):
-        for index, entity_section in enumerate(entities):
-            path = os.path.join(base_dir, ENTITIES_DEFS_PATH, entity_section.tag + '.def')
-            section = etree.parse(path, parser=etree.XMLParser(remove_comments=True))
-            entity_def = EntityDef(base_dir, entity_section.tag, section, self._alias)
+        entity_def = self._parse_entity_def(name)
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self._cache_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(entity_def, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except OSError as e:
+            logging.warning("Failed to cache definition %s: %s", path, e)
+        return entity_def
 
-            self._entity_defs_by_name[entity_section.tag] = entity_def
-            self._entity_defs_by_index[index] = entity_def
+    def _parse_entity_def(self, name: str) -> EntityDef:
+        path = os.path.join(self._base_dir, ENTITIES_DEFS_PATH, name + '.def')
+        section = etree.parse(path, parser=etree.XMLParser(remove_comments=True))
+        return EntityDef(self._base_dir, name, section, self._alias)
 
     def _parse(self, base_dir):
         tree = etree.parse(os.path.join(base_dir, 'scripts/entities.xml'),
                            parser=etree.XMLParser(remove_comments=True))
         root = tree.getroot()
-        self._parse_entities(base_dir, root.find('ClientServerEntities'))
+        self._entity_names = [section.tag for section in root.find('ClientServerEntities')]
@@ -5,10 +5,14 @@ from typing import List, Dict, Tuple
 from lxml import etree
 
 from .base_definition import BaseDataObjectDef
+from .constants import EntityFlags
 from .data_types import DataType, Alias, INFINITY
 
 DEFAULT_HEADER_SIZE = 1
 
+# order of volatile values stored by entities
+VOLATILES = ('position', 'yaw', 'pitch', 'roll')
+
 
 class MethodArgument:
     def __init__(self, type_: DataType, name=None):
@@ -124,6 +128,7 @@ class EntityDef(BaseDataObjectDef):
         super(EntityDef, self).__init__(base_dir, alias)
 
         self._parse_section(section)
+        self._build_tables()
 
     def get_name(self):
         return self._name
@@ -143,6 +148,69 @@ class EntityDef(BaseDataObjectDef):
     def volatiles(self):
         return self._volatile
 
+    def get_volatile_defaults(self) -> tuple:
+        """
+        Initial volatile values in VOLATILES order, None for missing ones
+        """
+        return self._volatile_defaults
+
+    def get_client_methods(self) -> List[EntityMethod]:
+        """
+        Client methods by exposed index
+        """
+        return self._client_methods_table
+
+    def get_client_properties(self) -> list:
+        """
+        Client properties by exposed index
+        """
+        return self._client_properties
+
+    def get_client_properties_internal(self) -> list:
+        return self._client_properties_internal
+
+    def get_cell_properties(self) -> list:
+        return self._cell_properties
+
+    def get_base_properties(self) -> list:
+        return self._base_properties
+
+    def _build_tables(self):
+        """
+        Tables shared by all entities of this type
+        """
+        self._volatile_defaults = tuple(self._volatile.get(name) for name in VOLATILES)
+        self._client_methods_table = self._client_methods.get_exposed_index_map()
+
+        self._client_properties = self._properties.get_properties_by_flags(
+            EntityFlags.ALL_CLIENTS
+            | EntityFlags.BASE_AND_CLIENT
+            | EntityFlags.OTHER_CLIENTS
+            | EntityFlags.OWN_CLIENT
+            | EntityFlags.CELL_PUBLIC_AND_OWN
+            | EntityFlags.ALL_CLIENTS,
+            exposed_index=True,
+        )
+        self._client_properties_internal = self._properties.get_properties_by_flags(
+            EntityFlags.ALL_CLIENTS
+            |
+            # not used for some reason
+            # EntityFlags.BASE_AND_CLIENT |
+            EntityFlags.OTHER_CLIENTS
+            | EntityFlags.OWN_CLIENT
+            | EntityFlags.CELL_PUBLIC_AND_OWN
+            | EntityFlags.ALL_CLIENTS
+        )
+        self._cell_properties = self._properties.get_properties_by_flags(
+            EntityFlags.CELL_PUBLIC_AND_OWN
+            | EntityFlags.CELL_PUBLIC
+            # | EntityFlags.CELL_PRIVATE
+        )
+        self._base_properties = self._properties.get_properties_by_flags(
+            # EntityFlags.BASE |
+            EntityFlags.BASE_AND_CLIENT
+        )
+
     def _parse_cell_methods(self, section: etree.ElementBase):
         if section is None:
             return
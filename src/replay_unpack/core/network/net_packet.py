@@ -2,16 +2,50 @@
 import struct
 from io import BytesIO
 
+# size, type and time
+PACKET_HEADER = struct.Struct('IIf')
+
 
 class NetPacket(object):
-    __slots__ = ('size', 'type', 'time', 'raw_data')
+    __slots__ = ('size', 'type', 'time', 'buffer', 'offset', '_raw_data')
+
+    HEADER_SIZE = PACKET_HEADER.size
 
     def __init__(self, stream):
-        self.size, = struct.unpack('I', stream.read(4))
-        self.type, = struct.unpack('I', stream.read(4))
-        self.time, = struct.unpack('f', stream.read(4))
+        self.size, self.type, self.time = PACKET_HEADER.unpack(
+            stream.read(self.HEADER_SIZE))
+
+        self.buffer = memoryview(stream.read(self.size))
+        self.offset = 0
+        self._raw_data = None
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int) -> 'NetPacket':
+        """
+        Frame packet starting at given offset of buffer,
+        payload is not copied, packet refers to buffer instead
+        """
+        packet = cls.__new__(cls)
+        packet.size, packet.type, packet.time = PACKET_HEADER.unpack_from(
+            buffer, offset)
+
+        packet.buffer = buffer
+        packet.offset = offset + cls.HEADER_SIZE
+        packet._raw_data = None
+        return packet
+
+    @property
+    def payload(self) -> memoryview:
+        return self.buffer[self.offset:self.offset + self.size]
 
-        self.raw_data = BytesIO(stream.read(self.size))
+    @property
+    def raw_data(self) -> BytesIO:
+        """
+        Payload as stream, for packets that can't be read from buffer
+        """
+        if self._raw_data is None:
+            self._raw_data = BytesIO(self.payload)
+        return self._raw_data
 
     def __repr__(self):
         return "TIME: {} TYPE: {} SIZE: {} DATA: {}".format(
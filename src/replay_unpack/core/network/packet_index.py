@@ -0,0 +1,85 @@
+# coding=utf-8
+import struct
+from typing import Dict, Iterable
+
+import numpy
+
+from .net_packet import NetPacket
+
+PACKET_INDEX_DTYPE = numpy.dtype([
+    # offset of packet header in payload
+    ('offset', numpy.uint64),
+    ('size', numpy.uint32),
+    ('type', numpy.uint32),
+    ('time', numpy.float32),
+])
+
+
+class PacketIndex(object):
+    """
+    Table of all packets of decompressed payload,
+    built in one framing pass without deserializing packets;
+    """
+
+    def __init__(self, entries: numpy.ndarray):
+        self.entries = entries
+        # last packet of replay has zero time,
+        # so search is done over running maximum of time
+        self._search_time = numpy.maximum.accumulate(entries['time'])
+
+    @classmethod
+    def from_buffer(cls, buffer) -> 'PacketIndex':
+        view = memoryview(buffer)
+        unpack_size = struct.Struct('I').unpack_from
+
+        offsets = []
+        offset = 0
+        while offset != len(view):
+            offsets.append(offset)
+            size, = unpack_size(view, offset)
+            offset += NetPacket.HEADER_SIZE + size
+
+        offsets = numpy.array(offsets, dtype=numpy.uint64)
+        data = numpy.frombuffer(view, dtype=numpy.uint8)
+        headers = data[
+            offsets[:, None].astype(numpy.intp) + numpy.arange(NetPacket.HEADER_SIZE)
+        ].view(numpy.dtype([('size', 'u4'), ('type', 'u4'), ('time', 'f4')]))[:, 0]
+
+        entries = numpy.empty(len(offsets), dtype=PACKET_INDEX_DTYPE)
+        entries['offset'] = offsets
+        entries['size'] = headers['size']
+        entries['type'] = headers['type']
+        entries['time'] = headers['time']
+        return cls(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, item):
+        return self.entries[item]
+
+    def get_counts(self) -> Dict[int, int]:
+        """
+        Number of packets of every packet type
+        """
+        types, counts = numpy.unique(self.entries['type'], return_counts=True)
+        return dict(zip(types.tolist(), counts.tolist()))
+
+    def seek(self, t: float) -> int:
+        """
+        Position of first packet with time not less than t
+        """
+        return int(numpy.searchsorted(self._search_time, t, side='left'))
+
+    def seek_after(self, t: float) -> int:
+        """
+        Position of first packet with time greater than t
+        """
+        return int(numpy.searchsorted(self._search_time, t, side='right'))
+
+    def get_positions(self, types: Iterable[int], stop: int = None) -> numpy.ndarray:
+        """
+        Positions of packets of given types before stop position
+        """
+        types = numpy.fromiter(types, dtype=numpy.uint32)
+        return numpy.flatnonzero(numpy.isin(self.entries['type'][:stop], types))
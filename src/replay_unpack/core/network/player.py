@@ -1,18 +1,89 @@
 #!/usr/bin/python
 # coding=utf-8
 import logging
+import mmap
+import struct
 from abc import ABC
-from io import BytesIO
+from time import perf_counter
+from typing import Iterable, Iterator, Optional, Union
 
+from replay_unpack.core.tracing import TraceEvent, TraceSink
 from .net_packet import NetPacket
+from .packet_index import PacketIndex
 
 
 class PlayerBase:
-    def __init__(self, version: list[str]):
+    def __init__(
+        self, version: list[str], trace_sink: Optional[TraceSink] = None
+    ):
         self._version = tuple([int(i) for i in version])
         self._definitions = self._get_definitions(version)
 
         self._mapping = self._get_packets_mapping()
+        # packet classes may implement from_buffer(buffer, offset, size)
+        # to be read without copying payload into stream
+        self._deserializers = {
+            packet_type: (getattr(packet_class, 'from_buffer', None), packet_class)
+            for packet_type, packet_class in self._mapping.items()
+        }
+
+        if trace_sink is not None:
+            self._enable_tracing(trace_sink)
+
+    def _enable_tracing(self, sink: TraceSink):
+        """
+        Wrap packet deserialization and processing to emit
+        trace event for every played packet;
+        Wrappers are set once here, so there is no overhead without tracing
+        """
+        deserialize_packet = self._deserialize_packet
+        process_packet = self._process_packet
+        # start time, type and size of played packet,
+        # header of packet if it was skipped instead of decoded
+        current = [0.0, 0, 0, None]
+
+        def traced_deserialize_packet(packet: NetPacket):
+            current[:] = perf_counter(), packet.type, packet.size, None
+            decoded = deserialize_packet(packet)
+            if decoded is None:
+                current[3] = self._read_skipped_packet(packet)
+            return decoded
+
+        def traced_process_packet(packet, t: float):
+            try:
+                process_packet(packet, t)
+            finally:
+                started, packet_type, size, skipped = current
+                # header refers to replay data, which is not kept
+                current[3] = None
+                event = self._get_trace_event(
+                    packet if skipped is None else skipped,
+                    t, packet_type, size, perf_counter() - started)
+                if skipped is not None:
+                    event = event._replace(skipped=True)
+                sink(event)
+
+        self._deserialize_packet = traced_deserialize_packet
+        self._process_packet = traced_process_packet
+
+    def _get_trace_event(
+        self, packet, t: float, packet_type: int, size: int, duration: float
+    ) -> TraceEvent:
+        return TraceEvent(
+            time=t,
+            packet_type=packet_type,
+            packet=None if packet is None else packet.__class__.__name__,
+            size=size,
+            duration=duration,
+        )
+
+    def _read_skipped_packet(self, packet: NetPacket):
+        """
+        Read only header of packet of known type, which was skipped
+        instead of decoded, so it can be described in trace;
+        None if packet is unknown
+        """
+        return None
 
     def _get_definitions(self, version):
         raise NotImplementedError
@@ -20,24 +91,122 @@ class PlayerBase:
     def _get_packets_mapping(self):
         raise NotImplementedError
 
+    def _get_setup_packets(self) -> tuple:
+        """
+        Packet classes which are played even before start of
+        played time window, e.g. ones creating and destroying entities
+        """
+        return ()
+
     def _deserialize_packet(self, packet: NetPacket):
+        try:
+            from_buffer, packet_class = self._deserializers[packet.type]
+        except KeyError:
+            if logging.getLogger().isEnabledFor(logging.INFO):
+                logging.info(
+                    "unknown packet %s %s",
+                    hex(packet.type),
+                    packet.payload.hex(),
+                )
+            return None
 
-        if packet.type in self._mapping:
-            return self._mapping[packet.type](packet.raw_data)
-        logging.info(
-            "unknown packet %s %s",
-            hex(packet.type),
-            str(packet.raw_data.read().hex()),
-        )
-        return None
+        if from_buffer is not None:
+            return from_buffer(packet.buffer, packet.offset, packet.size)
+        return packet_class(packet.raw_data)
 
     def _process_packet(self, packet, t: float):
         raise NotImplementedError
 
-    def play(self, replay_data, strict_mode=False):
-        io = BytesIO(replay_data)
-        while io.tell() != len(replay_data):
-            packet = NetPacket(io)
+    @staticmethod
+    def _iter_packets(replay_data) -> Iterator[NetPacket]:
+        view = memoryview(replay_data)
+        offset = 0
+        while offset != len(view):
+            packet = NetPacket.from_buffer(view, offset)
+            yield packet
+            offset = packet.offset + packet.size
+
+    @classmethod
+    def _iter_packets_from_chunks(cls, chunks: Iterable[bytes]) -> Iterator[NetPacket]:
+        """
+        Frame packets from stream of decompressed chunks,
+        every packet is yielded as soon as it is fully received
+        """
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+
+            # find end of last complete packet in buffer
+            end = 0
+            while len(buffer) - end >= NetPacket.HEADER_SIZE:
+                size, = struct.unpack_from('I', buffer, end)
+                if end + NetPacket.HEADER_SIZE + size > len(buffer):
+                    break
+                end += NetPacket.HEADER_SIZE + size
+
+            if end:
+                complete = bytes(buffer[:end])
+                del buffer[:end]
+                yield from cls._iter_packets(complete)
+
+        if buffer:
+            raise RuntimeError("Replay data is truncated, %s bytes left" % len(buffer))
+
+    @staticmethod
+    def build_index(replay_data: Union[bytes, mmap.mmap]) -> PacketIndex:
+        """
+        Build index of all packets of decompressed payload
+        """
+        return PacketIndex.from_buffer(replay_data)
+
+    def _iter_packets_in_window(self, replay_data, start: Optional[float], end: Optional[float]) -> Iterator[NetPacket]:
+        """
+        Frame packets with time in [start, end] using packet index,
+        packets before start are skipped unless they are setup packets
+        """
+        view = memoryview(replay_data)
+        index = self.build_index(view)
+        first = index.seek(start) if start is not None else 0
+        last = index.seek_after(end) if end is not None else len(index)
+
+        setup_packets = self._get_setup_packets()
+        setup_types = [packet_type for packet_type, packet_class in self._mapping.items()
+                       if packet_class in setup_packets]
+        offsets = index.entries['offset']
+        for position in index.get_positions(setup_types, first).tolist():
+            yield NetPacket.from_buffer(view, int(offsets[position]))
+        for offset in offsets[first:last].tolist():
+            yield NetPacket.from_buffer(view, offset)
+
+    def play(self, replay_data: Union[bytes, mmap.mmap, Iterable[bytes]], strict_mode=False,
+             start: Optional[float] = None, end: Optional[float] = None):
+        """
+        Play replay data, which is either whole decompressed
+        payload or iterable over its chunks (streaming mode);
+        If start or end is set, only packets in [start, end] time window
+        are played, plus setup packets before start, which only restore
+        state: events are recorded for packets in time window only,
+        along with last frame recorded by get_info
+        """
+        for _ in self._iter_play(replay_data, strict_mode, start, end):
+            pass
+
+    def _iter_play(self, replay_data: Union[bytes, mmap.mmap, Iterable[bytes]], strict_mode=False,
+                   start: Optional[float] = None, end: Optional[float] = None) -> Iterator[float]:
+        """
+        Play replay data like play, yielding time of every played packet,
+        so state may be looked at while replay is played
+        """
+        if start is not None or end is not None:
+            if not isinstance(replay_data, (bytes, bytearray, memoryview, mmap.mmap)):
+                replay_data = b''.join(replay_data)
+            packets = self._iter_packets_in_window(replay_data, start, end)
+        elif isinstance(replay_data, (bytes, bytearray, memoryview, mmap.mmap)):
+            packets = self._iter_packets(replay_data)
+        else:
+            packets = self._iter_packets_from_chunks(replay_data)
+
+        for packet in packets:
             try:
                 self._process_packet(
                     self._deserialize_packet(packet), packet.time
@@ -51,13 +220,52 @@ class PlayerBase:
                 )
                 if strict_mode:
                     raise
+            yield packet.time
 
 
 class ControlledPlayerBase(PlayerBase, ABC):
-    def __init__(self, version: str):
+    # attributes of packets with id of entity they are related to
+    _ENTITY_ID_ATTRIBUTES = (
+        'entityId', 'entityID', 'objectID', 'entity_id', 'entityId1'
+    )
+
+    def __init__(self, version: str, trace_sink: Optional[TraceSink] = None):
         self._battle_controller = self._get_controller(version)
 
-        super(ControlledPlayerBase, self).__init__(version)
+        super(ControlledPlayerBase, self).__init__(version, trace_sink)
+
+    def _get_trace_event(
+        self, packet, t: float, packet_type: int, size: int, duration: float
+    ) -> TraceEvent:
+        # packets depend on core package, which imports this module
+        from replay_unpack.core.packets import EntityMethod, EntityProperty
+
+        event = super(ControlledPlayerBase, self)._get_trace_event(
+            packet, t, packet_type, size, duration
+        )
+        for attribute in self._ENTITY_ID_ATTRIBUTES:
+            entity_id = getattr(packet, attribute, None)
+            if entity_id is not None:
+                break
+        else:
+            return event
+
+        entity = self._battle_controller.entities.get(entity_id)
+        if entity is None:
+            return event._replace(entity_id=entity_id)
+
+        member = None
+        try:
+            if isinstance(packet, EntityMethod):
+                member = entity.get_client_method_name(packet.messageId)
+            elif isinstance(packet, EntityProperty):
+                member = entity.client_properties[packet.messageId].get_name()
+        except IndexError:
+            # broken packet, it is reported by player anyway
+            pass
+        return event._replace(
+            entity_id=entity_id, entity=entity.get_name(), member=member
+        )
 
     def _get_controller(self, version):
         raise NotImplementedError
@@ -4,6 +4,8 @@ from io import BytesIO as StringIO
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+LENGTH = struct.Struct('I')
+
 
 class BinaryStream(PrettyPrintObjectMixin):
     __slots__ = (
@@ -15,5 +17,16 @@ class BinaryStream(PrettyPrintObjectMixin):
         self._length, = struct.unpack('I', stream.read(4))
         self.value = stream.read(self._length)
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int) -> 'BinaryStream':
+        """
+        Read stream at given offset of buffer, value is a view on buffer
+        """
+        obj = cls.__new__(cls)
+        obj._length, = LENGTH.unpack_from(buffer, offset)
+        offset += LENGTH.size
+        obj.value = buffer[offset:offset + obj._length]
+        return obj
+
     def io(self):
         return StringIO(self.value)
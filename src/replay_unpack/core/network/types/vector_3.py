@@ -3,6 +3,8 @@ import struct
 
 from replay_unpack.core import PrettyPrintObjectMixin
 
+VECTOR_3 = struct.Struct('fff')
+
 
 class Vector3(PrettyPrintObjectMixin):
     __slots__ = (
@@ -13,3 +15,9 @@ class Vector3(PrettyPrintObjectMixin):
         self.x, = struct.unpack('f', stream.read(4))
         self.y, = struct.unpack('f', stream.read(4))
         self.z, = struct.unpack('f', stream.read(4))
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int) -> 'Vector3':
+        obj = cls.__new__(cls)
+        obj.x, obj.y, obj.z = VECTOR_3.unpack_from(buffer, offset)
+        return obj
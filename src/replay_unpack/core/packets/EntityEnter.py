@@ -13,3 +13,10 @@ class EntityEnter(PrettyPrintObjectMixin):
     def __init__(self, stream):
         self.entityId, self.spaceId, self.vehicleID = \
             struct.unpack('iii', stream.read(12))
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> 'EntityEnter':
+        packet = cls.__new__(cls)
+        packet.entityId, packet.spaceId, packet.vehicleID = \
+            struct.unpack_from('iii', buffer, offset)
+        return packet
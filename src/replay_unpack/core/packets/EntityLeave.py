@@ -12,3 +12,9 @@ class EntityLeave(PrettyPrintObjectMixin):
 
     def __init__(self, stream):
         self.entityId, = struct.unpack('i', stream.read(4))
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> 'EntityLeave':
+        packet = cls.__new__(cls)
+        packet.entityId, = struct.unpack_from('i', buffer, offset)
+        return packet
@@ -4,6 +4,8 @@ import struct
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import BinaryStream
 
+HEADER = struct.Struct('II')
+
 
 class EntityProperty(PrettyPrintObjectMixin):
     """
@@ -20,3 +22,10 @@ class EntityProperty(PrettyPrintObjectMixin):
         self.objectID, = struct.unpack('I', stream.read(4))
         self.messageId, = struct.unpack('I', stream.read(4))
         self.data = BinaryStream(stream)
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> 'EntityProperty':
+        packet = cls.__new__(cls)
+        packet.objectID, packet.messageId = HEADER.unpack_from(buffer, offset)
+        packet.data = BinaryStream.from_buffer(buffer, offset + HEADER.size)
+        return packet
@@ -1,5 +1,4 @@
 # coding=utf-8
-import logging
 from operator import index
 import struct
 from io import BytesIO
@@ -23,6 +22,18 @@ class NestedProperty(PrettyPrintObjectMixin):
         self.payload = stream.read()
         assert len(self.payload) == self.payload_size
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> "NestedProperty":
+        packet = cls.__new__(cls)
+        packet.entity_id, is_slice, packet.payload_size = struct.unpack_from(
+            "=Ibb", buffer, offset
+        )
+        packet.is_slice = is_slice == 1
+        packet.u = bytes(buffer[offset + 6:offset + 9])  # unknown
+        packet.payload = bytes(buffer[offset + 9:offset + size])
+        assert len(packet.payload) == packet.payload_size
+        return packet
+
     def read_and_apply(self, entity):
         bit_reader = BitReader(self.payload)
         obj = entity
@@ -51,13 +62,11 @@ class NestedProperty(PrettyPrintObjectMixin):
             max_bits = BitReader.bits_required(len(obj))
             index1 = bit_reader.get(max_bits)
             field = obj.get_field_name_for_index(index1)
-            logging.debug("old obj[%s] = %s", field, obj[field])
             obj[field] = obj.get_field_type_for_index(
                 index1
             ).create_from_stream(BytesIO(bit_reader.get_rest()))
             prop_path.append(field)
             entity.set_client_nested_property(prop_path, obj)
-            logging.debug("new obj[%s] = %s", field, obj[field])
 
         elif isinstance(obj, PyFixedList):
             if self.is_slice:
@@ -65,22 +74,15 @@ class NestedProperty(PrettyPrintObjectMixin):
             else:
                 max_bits = BitReader.bits_required(len(obj))
             index1 = bit_reader.get(max_bits)
-            logging.debug("Bits per array index: %s", max_bits)
-            logging.debug("List index: %s", index1)
             if self.is_slice:
                 index2 = bit_reader.get(max_bits)
                 prop_path.append(f"{index1}:{index2}")
-                logging.debug("Slice index: %s", index2)
             else:
                 prop_path.append(index1)
 
             rest = bit_reader.get_rest()
             if not rest:
-                logging.debug(
-                    "empty response, bytes read %s", bit_reader.bytes_read
-                )
                 if self.is_slice:
-                    logging.debug("removing element %s", obj[index1:index2])
                     obj[index1:index2] = []
                 else:
                     obj[index1] = None
@@ -90,22 +92,13 @@ class NestedProperty(PrettyPrintObjectMixin):
             # read elements unless io is empty, sizes should match
             while io.tell() != len(rest):
                 t = obj.get_element_type().create_from_stream(io)
-                logging.debug(
-                    "Bytes left in io: %s of %s", io.tell(), len(rest)
-                )
                 new_elements.append(t)
             assert io.tell() == len(rest)
-            logging.debug("old list object: %s", obj)
 
             if self.is_slice:
-                logging.debug(
-                    "replacing %s:%s with %s", index1, index2, new_elements
-                )
                 obj[index1:index2] = new_elements
             else:
-                logging.debug("setting %s with %s", index1, new_elements[0])
                 obj[index1] = new_elements[0]
-            logging.debug("new list object: %s", obj)
             entity.set_client_nested_property(prop_path, obj)
         else:
             raise NotImplementedError(type(obj))
@@ -1,11 +1,14 @@
 # coding=utf-8
 import struct
-from io import BytesIO
 
 from replay_unpack.core import PrettyPrintObjectMixin
 from replay_unpack.core.network.types import Vector3
 
 
+IDS = struct.Struct('ii')
+ROTATION = struct.Struct('=fffb')
+
+
 class Position(PrettyPrintObjectMixin):
     __slots__ = (
         'entityId',
@@ -27,3 +30,13 @@ class Position(PrettyPrintObjectMixin):
         self.pitch, = struct.unpack('f', stream.read(4))
         self.roll, = struct.unpack('f', stream.read(4))
         self.is_error, = struct.unpack('b', stream.read(1))
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int, size: int) -> 'Position':
+        packet = cls.__new__(cls)
+        packet.entityId, packet.vehicleId = IDS.unpack_from(buffer, offset)
+        packet.position = Vector3.from_buffer(buffer, offset + 8)
+        packet.positionError = Vector3.from_buffer(buffer, offset + 20)
+        packet.yaw, packet.pitch, packet.roll, packet.is_error = \
+            ROTATION.unpack_from(buffer, offset + 32)
+        return packet
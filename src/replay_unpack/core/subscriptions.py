@@ -0,0 +1,150 @@
+# coding=utf-8
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+class NestedPropertyNode:
+    """
+    Node of nested property subscriptions tree,
+    children are keyed by property path segments
+    """
+
+    __slots__ = ("callbacks", "children")
+
+    def __init__(self):
+        self.callbacks: List[Callable] = []
+        self.children: Dict[str, "NestedPropertyNode"] = {}
+
+    def add(self, path: List[str], func: Callable):
+        node = self
+        for segment in path:
+            node = node.children.setdefault(segment, NestedPropertyNode())
+        if func not in node.callbacks:
+            node.callbacks.append(func)
+
+    def remove(self, func: Callable):
+        """
+        Remove callback from this node and its children,
+        children left without callbacks are dropped
+        """
+        if func in self.callbacks:
+            self.callbacks.remove(func)
+        for segment, child in list(self.children.items()):
+            child.remove(func)
+            if not child.callbacks and not child.children:
+                del self.children[segment]
+
+    def iter_callbacks(self, prop_path: list) -> Iterator[Callable]:
+        """
+        Iterate over callbacks subscribed to given path or to its parents
+        """
+        node = self
+        for segment in prop_path:
+            node = node.children.get(str(segment))
+            if node is None:
+                return
+            yield from node.callbacks
+
+
+class Subscriptions:
+    """
+    Callbacks of single playback (usually owned by battle controller),
+    which are triggered on entity method calls and property changes.
+
+    Callbacks of every method and property are stored in a list,
+    which is never replaced, so entities may keep per-index tables
+    of these lists and look subscriptions up without building names.
+    """
+
+    def __init__(self):
+        self._methods: Dict[Tuple[str, str], List[Callable]] = {}
+        self._properties: Dict[Tuple[str, str], List[Callable]] = {}
+        # entity name -> tree of property paths
+        self._nested_properties: Dict[str, NestedPropertyNode] = {}
+
+        # entity name -> callbacks by exposed index
+        self._method_tables: Dict[str, List[List[Callable]]] = {}
+        self._property_tables: Dict[str, List[List[Callable]]] = {}
+
+    @staticmethod
+    def _add(registry: dict, key, func: Callable):
+        funcs = registry.setdefault(key, [])
+        # same callback is triggered once, even if subscribed many times
+        if func not in funcs:
+            funcs.append(func)
+
+    def subscribe_method_call(self, entity_name: str, method_name: str, func: Callable):
+        """
+        Add callbacks that should be triggered when given method called
+        """
+        self._add(self._methods, (entity_name, method_name), func)
+
+    def subscribe_property_change(self, entity_name: str, prop_name: str, func: Callable):
+        """
+        Add callbacks that should be triggered when given property changed
+        """
+        self._add(self._properties, (entity_name, prop_name), func)
+
+    def subscribe_nested_property_change(self, entity_name: str, prop_path: str, func: Callable):
+        """
+        Add callbacks that should be triggered when given nested property
+        (dot separated path, e.g. "state.controlPoints") or anything inside it changed
+        """
+        self.get_nested_property_tree(entity_name).add(prop_path.split("."), func)
+
+    def unsubscribe(self, func: Callable):
+        """
+        Remove callback from everything it is subscribed to,
+        methods and properties left without callbacks are not decoded anymore
+        """
+        for funcs in chain(self._methods.values(), self._properties.values()):
+            # lists are shared with tables of entities, so they are changed in place
+            if func in funcs:
+                funcs.remove(func)
+        for node in self._nested_properties.values():
+            node.remove(func)
+
+    def get_method_table(self, entity_name: str, methods: list) -> List[List[Callable]]:
+        """
+        Get callbacks of every method of entity by exposed index
+        """
+        try:
+            return self._method_tables[entity_name]
+        except KeyError:
+            table = self._method_tables[entity_name] = [
+                self._methods.setdefault((entity_name, method.get_name()), [])
+                for method in methods
+            ]
+            return table
+
+    def get_property_table(self, entity_name: str, properties: list) -> List[List[Callable]]:
+        """
+        Get callbacks of every client property of entity by exposed index
+        """
+        try:
+            return self._property_tables[entity_name]
+        except KeyError:
+            table = self._property_tables[entity_name] = [
+                self._properties.setdefault((entity_name, prop.get_name()), [])
+                for prop in properties
+            ]
+            return table
+
+    def get_nested_property_tree(self, entity_name: str) -> NestedPropertyNode:
+        """
+        Get root of nested property subscriptions of entity
+        """
+        try:
+            return self._nested_properties[entity_name]
+        except KeyError:
+            node = self._nested_properties[entity_name] = NestedPropertyNode()
+            return node
+
+    def iter_nested_property_subscriptions(self, entity_name: str, prop_path: list) -> Iterator[Callable]:
+        """
+        Iterate over callbacks of changed nested property
+        """
+        node = self._nested_properties.get(entity_name)
+        if node is None:
+            return iter(())
+        return node.iter_callbacks(prop_path)
@@ -0,0 +1,44 @@
+# coding=utf-8
+import logging
+from typing import Callable, NamedTuple, Optional
+
+
+class TraceEvent(NamedTuple):
+    """
+    Played packet, emitted for every packet when tracing is enabled
+    """
+
+    time: float
+    # type of packet in replay and name of its class, None if unknown
+    packet_type: int
+    packet: Optional[str]
+    size: int
+    entity_id: Optional[int] = None
+    entity: Optional[str] = None
+    # called method or changed property
+    member: Optional[str] = None
+    # seconds spent on decoding and handling of packet
+    duration: float = 0.0
+    # packet of known type which was not decoded, as nothing handles it
+    skipped: bool = False
+
+
+TraceSink = Callable[[TraceEvent], None]
+
+
+def log_trace_event(event: TraceEvent):
+    """
+    Sink writing trace events to debug log
+    """
+    logging.debug(
+        "%.3f %s(%s) %s bytes, %s<%s>.%s in %.1fus%s",
+        event.time,
+        event.packet,
+        hex(event.packet_type),
+        event.size,
+        event.entity,
+        event.entity_id,
+        event.member,
+        event.duration * 1e6,
+        " (skipped)" if event.skipped else "",
+    )
@@ -0,0 +1,81 @@
+# coding=utf-8
+import hashlib
+import mmap
+import os
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+
+
+class PayloadCache(object):
+    """
+    On-disk cache of decrypted & decompressed replay payloads.
+    Entries are keyed by sha256 of encrypted payload, so same replay
+    is decrypted and decompressed only once, no matter how it was named.
+    Hits are memory-mapped, least recently used entries are evicted
+    when total size of cache exceeds max_size;
+    """
+    SUFFIX = '.bin'
+
+    def __init__(self, path: str, max_size: int = DEFAULT_MAX_SIZE):
+        self._path = path
+        self._max_size = max_size
+        os.makedirs(self._path, exist_ok=True)
+
+    @staticmethod
+    def get_key(dirty_data) -> str:
+        return hashlib.sha256(dirty_data).hexdigest()
+
+    def get(self, key: str) -> Optional[mmap.mmap]:
+        path = self._get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # mark entry as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return data
+
+    def put(self, key: str, data: bytes):
+        for _ in self.iter_and_put(key, [data]):
+            pass
+
+    def iter_and_put(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass chunks through and store them,
+        entry is added only if all chunks were consumed;
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self._path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, self._get_path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._evict()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self._path, key + self.SUFFIX)
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self._path):
+            if entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # entry is in use (e.g. mapped on windows), try next one
+                continue
+            total_size -= size
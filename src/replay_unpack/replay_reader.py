@@ -1,13 +1,17 @@
 # coding=utf-8
+import io
 import json
+import mmap
 import os
 import struct
 import zlib
-from io import BytesIO
-from typing import NamedTuple
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
+import numpy
 from Cryptodome.Cipher import Blowfish
 
+from .payload_cache import PayloadCache
+
 BASE_DIR = os.path.dirname(__file__)
 WOWS_BLOWFISH_KEY = b''.join([b'\x29', b'\xB7', b'\xC9', b'\x09', b'\x38', b'\x3F', b'\x84', b'\x88',
                               b'\xFA', b'\x98', b'\xEC', b'\x4E', b'\x13', b'\x19', b'\x79', b'\xFB'])
@@ -25,14 +29,51 @@ TYPE_TO_KEY = {
 }
 ALLOWED_TYPES = set(TYPE_TO_KEY.keys())
 
+# size of encrypted data decrypted at once in streaming mode,
+# must be multiple of blowfish block size (8 bytes)
+STREAM_CHUNK_SIZE = 1024 * 1024
+
 ReplayInfo = NamedTuple('ReplayInfo', [
     ('game', str),
     ('engine_data', dict),
     ('extra_data', list),
-    ('decrypted_data', bytes),
+    # bytes, mmap of cached payload
+    # or iterator over decompressed chunks in streaming mode
+    ('decrypted_data', Union[bytes, mmap.mmap, Iterator[bytes]]),
+])
+
+ReplayProbe = NamedTuple('ReplayProbe', [
+    ('game', str),
+    ('engine_data', dict),
+    ('arena_id', Optional[int]),
+    # size of encrypted payload in bytes
+    ('payload_size', int),
 ])
 
 
+def map_replay(replay) -> memoryview:
+    """
+    Get read-only view of replay without reading it into memory.
+    Replay may be a path, mmap or file object, file object is mapped
+    starting from its current position;
+    """
+    if isinstance(replay, mmap.mmap):
+        return memoryview(replay)
+    if isinstance(replay, (str, os.PathLike)):
+        with open(replay, 'rb') as f:
+            return map_replay(f)
+
+    offset = replay.tell()
+    try:
+        data = mmap.mmap(replay.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError):
+        # not a real file (e.g. BytesIO) or empty file
+        if isinstance(replay, io.BytesIO):
+            return replay.getbuffer()[offset:]
+        return memoryview(replay.read())
+    return memoryview(data)[offset:]
+
+
 class ReplayReader(object):
     """
     # Header
@@ -57,56 +98,144 @@ class ReplayReader(object):
     See http://wiki.vbaddict.net/pages/File_Replays for more details;
     """
 
-    def __init__(self, replay_path, dump_binary=False):
+    def __init__(self, replay_path: Union[str, mmap.mmap], dump_binary=False,
+                 cache: Optional[PayloadCache] = None, replay_type: Optional[str] = None):
         self._dump_binary_data = dump_binary
-        self._replay_path = replay_path
-        self._check_replay_exists()
+        self._cache = cache
+        self._replay = replay_path
+        if isinstance(replay_path, mmap.mmap):
+            self._replay_path = '<mmap>'
+            self._type = replay_type or WOWS_REPLAY
+        else:
+            self._replay_path = replay_path
+            self._check_replay_exists()
+            self._type = replay_type or self._replay_path.rsplit('.', 1)[-1]
 
-        self._type = self._replay_path.rsplit('.', 1)[-1]
         if self._type not in ALLOWED_TYPES:
             raise ValueError("Replay must be in following extensions: "
                              "%s" % ALLOWED_TYPES)
 
-    def get_replay_data(self) -> ReplayInfo:
+    def get_replay_data(self, stream=False) -> ReplayInfo:
         """
         Get open info about replay 
         (stored as Json at the beginning of file) 
         and closed one
         (after decrypt & decompress);
+        Use stream=True to get closed info as iterator over
+        decompressed chunks instead of reading whole payload into memory;
         :rtype: tuple[dict, str]
         """
-        with open(self._replay_path, 'rb') as f:
-            if f.read(4) != REPLAY_SIGNATURE:
-                raise ValueError("File %s is not a valid replay" % self._replay_path)
+        view = map_replay(self._replay)
+        engine_data, extra_blocks, offset = self._read_blocks(view)
+        extra_data = [json.loads(block) for block in extra_blocks]
 
-            blocks_count = struct.unpack("i", f.read(4))[0]
+        return ReplayInfo(
+            game=self._get_game(),
+            engine_data=engine_data,
+            extra_data=extra_data,
+            decrypted_data=self._get_decrypted_data(view[offset:], stream),
+        )
 
-            block_size = struct.unpack("i", f.read(4))[0]
-            engine_data = json.loads(f.read(block_size))
+    def probe(self) -> ReplayProbe:
+        """
+        Get open info about replay without reading encrypted payload,
+        which is much cheaper than get_replay_data;
+        """
+        view = map_replay(self._replay)
+        engine_data, extra_blocks, offset = self._read_blocks(view)
+        return ReplayProbe(
+            game=self._get_game(),
+            engine_data=engine_data,
+            arena_id=self._get_arena_id(extra_blocks),
+            payload_size=len(view) - offset,
+        )
+
+    def _read_blocks(self, view: memoryview) -> Tuple[dict, List[bytes], int]:
+        """
+        Read header and blocks of replay,
+        returns offset of encrypted payload as well;
+        :rtype: tuple[dict, list[bytes], int]
+        """
+        if view[:4] != REPLAY_SIGNATURE:
+            raise ValueError("File %s is not a valid replay" % self._replay_path)
+
+        blocks_count, block_size = struct.unpack_from("ii", view, 4)
+        offset = 12
+        engine_data = json.loads(bytes(view[offset:offset + block_size]))
+        offset += block_size
+
+        extra_blocks = []
+        for i in range(blocks_count - 1):
+            block_size, = struct.unpack_from("i", view, offset)
+            offset += 4
+            extra_blocks.append(bytes(view[offset:offset + block_size]))
+            offset += block_size
+        return engine_data, extra_blocks, offset
 
-            extra_data = []
-            for i in range(blocks_count - 1):
-                block_size = struct.unpack("i", f.read(4))[0]
-                data = json.loads(f.read(block_size))
-                extra_data.append(data)
+    def _get_game(self) -> str:
+        if self._type == WOWS_REPLAY:
+            return 'wows'
+        elif self._type == WOT_REPLAY:
+            return 'wot'
+        raise ValueError("Unknown replay type %s" % self._type)
+
+    @staticmethod
+    def _get_arena_id(extra_blocks: List[bytes]) -> Optional[int]:
+        """
+        Recent replays store "<id>.<arenaUniqueId>" in the last block
+        """
+        if not extra_blocks:
+            return None
+        try:
+            _, arena_id = extra_blocks[-1].decode('ascii').split('.')
+            return int(arena_id)
+        except ValueError:
+            return None
 
-            if self._type == WOWS_REPLAY:
-                game = 'wows'
-            elif self._type == WOT_REPLAY:
-                game = 'wot'
+    def _get_decrypted_data(self, dirty_data: memoryview, stream: bool) -> Union[bytes, mmap.mmap, Iterator[bytes]]:
+        """
+        Decrypt & decompress payload, using cache if it is set;
+        """
+        if self._cache is not None:
+            key = self._cache.get_key(dirty_data)
+            decrypted_data = self._cache.get(key)
+            if decrypted_data is not None:
+                if self._dump_binary_data:
+                    self._save_decrypted_data(decrypted_data)
+                return decrypted_data
+
+            if stream:
+                decrypted_data = self._cache.iter_and_put(
+                    key, self._iter_decompressed_data(self._iter_chunks(dirty_data)))
             else:
-                raise
-            decrypted_data = zlib.decompress(self.__decrypt_data(f.read()))
+                decrypted_data = zlib.decompress(self.__decrypt_data(dirty_data))
+                self._cache.put(key, decrypted_data)
+        elif stream:
+            decrypted_data = self._iter_decompressed_data(self._iter_chunks(dirty_data))
+        else:
+            decrypted_data = zlib.decompress(self.__decrypt_data(dirty_data))
 
-            if self._dump_binary_data:
-                self._save_decrypted_data(decrypted_data)
+        if self._dump_binary_data:
+            if stream:
+                return self._iter_and_save_decrypted_data(decrypted_data)
+            self._save_decrypted_data(decrypted_data)
+        return decrypted_data
 
-            return ReplayInfo(
-                game=game,
-                engine_data=engine_data,
-                extra_data=extra_data,
-                decrypted_data=decrypted_data,
-            )
+    @staticmethod
+    def _iter_chunks(dirty_data: memoryview) -> Iterator[memoryview]:
+        for offset in range(0, len(dirty_data), STREAM_CHUNK_SIZE):
+            yield dirty_data[offset:offset + STREAM_CHUNK_SIZE]
+
+    def _get_dump_path(self) -> str:
+        """
+        Path decrypted data is dumped to, named as given replay
+        but with '.hex' postfix ('replay.hex' if replay has no name);
+        """
+        name = getattr(self._replay, 'name', self._replay)
+        if not isinstance(name, (str, os.PathLike)):
+            # mmap or in-memory file
+            name = 'replay'
+        return '{}.hex'.format(os.path.basename(name))
 
     def _save_decrypted_data(self, decrypted_data):
         """
@@ -116,12 +245,20 @@ class ReplayReader(object):
         :raises ParserException
         """
         try:
-            replay_name = os.path.basename(self._replay_path)
-            with open('{}.hex'.format(replay_name), 'wb') as df:
+            with open(self._get_dump_path(), 'wb') as df:
                 df.write(decrypted_data)
         except IOError as e:
             print('Cannot dump replay: {}'.format(e))
 
+    def _iter_and_save_decrypted_data(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Same as _save_decrypted_data, but for streaming mode;
+        """
+        with open(self._get_dump_path(), 'wb') as df:
+            for chunk in chunks:
+                df.write(chunk)
+                yield chunk
+
     def _check_replay_exists(self):
         """
         Check if replay really exists. 
@@ -130,34 +267,66 @@ class ReplayReader(object):
         if not os.path.exists(self._replay_path):
             raise Exception("File does not exists: {}".format(self._replay_path))
 
-    @staticmethod
-    def __chunkify_string(string, length=8):
+    def __decrypt_data(self, dirty_data):
         """
-        Split string into blocks with given max len.
-        :type string: str
-        :type length: int|long
-        :rtype: tuple[int, str]
+        Decrypt replay payload.
+        Payload is encrypted with blowfish in ECB mode, and every block
+        is additionally xor-ed with previous decrypted one,
+        so whole payload is decrypted at once and chain is resolved
+        with cumulative xor over 8-bytes blocks;
+        :type dirty_data: bytes
+        :rtype: bytes
         """
-        for i in range(0, len(string), length):
-            yield i, string[0 + i:length + i]
-
-    def __decrypt_data(self, dirty_data):
-        previous_block = None  # type: str
         blowfish = Blowfish.new(TYPE_TO_KEY[self._type], Blowfish.MODE_ECB)
-        decrypted_data = BytesIO()
+        # FIXME: what first chunk is used for??
+        decrypted_data, _ = self._decrypt_chunk(blowfish, dirty_data[8:])
+        return decrypted_data
 
-        for index, chunk in self.__chunkify_string(dirty_data):
-            # FIXME: what this chunk is used for??
-            if index == 0:
-                continue
+    @staticmethod
+    def _decrypt_chunk(blowfish, chunk, previous_block=0):
+        """
+        Decrypt chunk of payload, which follows
+        block previous_block in decrypted stream;
+        :rtype: tuple[bytes, int]
+        """
+        blocks = numpy.bitwise_xor.accumulate(
+            numpy.frombuffer(blowfish.decrypt(chunk), dtype=numpy.uint64))
+        if not len(blocks):
+            return b'', previous_block
+        if previous_block:
+            blocks ^= numpy.uint64(previous_block)
+        return blocks.tobytes(), int(blocks[-1])
 
-            decrypted_block, = struct.unpack('q', blowfish.decrypt(chunk))
-            if previous_block:
-                # get two blocks, each 8 bytes long and xor them
-                # then pack them back to bytes
-                decrypted_block ^= previous_block
-            previous_block = decrypted_block
+    def _iter_decrypted_data(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Streaming version of __decrypt_data,
+        every chunk except last one must be multiple of 8 bytes;
+        """
+        blowfish = Blowfish.new(TYPE_TO_KEY[self._type], Blowfish.MODE_ECB)
+        previous_block = 0
+        is_first_chunk = True
+        for chunk in chunks:
+            if is_first_chunk:
+                # FIXME: what first chunk is used for??
+                chunk = chunk[8:]
+                is_first_chunk = False
+            decrypted_chunk, previous_block = self._decrypt_chunk(
+                blowfish, chunk, previous_block)
+            yield decrypted_chunk
 
-            decrypted_data.write(struct.pack('q', decrypted_block))
+    def _iter_decompressed_data(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Decrypt and decompress encrypted payload chunks,
+        yields decompressed data as soon as it is available;
+        """
+        decompressor = zlib.decompressobj()
+        for chunk in self._iter_decrypted_data(chunks):
+            decompressed = decompressor.decompress(chunk)
+            if decompressed:
+                yield decompressed
 
-        return decrypted_data.getvalue()
+        decompressed = decompressor.flush()
+        if decompressed:
+            yield decompressed
+        if not decompressor.eof:
+            raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
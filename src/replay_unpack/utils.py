@@ -2,6 +2,8 @@ import pickle
 import io
 import builtins
 
+import numpy as np
+
 
 safe_builtins = {
     "range",
@@ -33,6 +35,48 @@ def unpack_values(packed_value, pack_pattern):
     return tuple(values)
 
 
+def get_unpack_table(value_min, value_max, bits, converter=None) -> list[int]:
+    """
+    Rounded unpacked values for every packed value of given bits,
+    computed in one numpy pass with the same arithmetic as unpack_value,
+    so unpacking becomes a lookup by masked bits;
+    Converter (numpy ufunc, e.g. np.degrees) is applied before rounding.
+    """
+    mask = 2**bits - 1
+    values = np.arange(mask + 1, dtype=np.int64) / mask * (
+        abs(value_min) + abs(value_max)
+    ) - abs(value_min)
+    if converter is not None:
+        values = converter(values)
+    # rint rounds half to even, as round does
+    return np.rint(values).astype(np.int64).tolist()
+
+
+MINIMAP_PACK_PATTERN = (
+    (-2500.0, 2500.0, 11),
+    (-2500.0, 2500.0, 11),
+    (-3.141592753589793, 3.141592753589793, 8),
+)
+_MINIMAP_X, _MINIMAP_Y, _MINIMAP_YAW = (
+    get_unpack_table(value_min, value_max, bits, converter)
+    for (value_min, value_max, bits), converter in zip(
+        MINIMAP_PACK_PATTERN, (None, None, np.degrees)
+    )
+)
+
+
+def unpack_minimap_values(packed_value: int) -> tuple[int, int, int]:
+    """
+    Rounded x, y and yaw in degrees of minimap vision info,
+    same as rounding unpack_values with MINIMAP_PACK_PATTERN
+    """
+    return (
+        _MINIMAP_X[packed_value & 0x7FF],
+        _MINIMAP_Y[packed_value >> 11 & 0x7FF],
+        _MINIMAP_YAW[packed_value >> 22 & 0xFF],
+    )
+
+
 def unpack_plane_id(packed_value: int) -> tuple:
     # avatar_id, index, purpose, departures
     bits = [32, 3, 3, 1]
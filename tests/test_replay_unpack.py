@@ -0,0 +1,614 @@
+import copy
+import math
+import mmap
+import os
+import pickle
+import struct
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pytest
+from Cryptodome.Cipher import Blowfish
+
+from renderer.data import EventStream, EventTimeline, Events, Vehicle, VehicleTracks
+from renderer.render import Renderer
+from src.replay_parser import CustomReader, ReplayParser, probe_replays
+from replay_unpack.clients.wows.network.packets import PACKETS_MAPPING_12_6_0
+from replay_unpack.clients.wows.helper import BASE_DIR, get_definitions
+from replay_unpack.core.entity import Entity, LazyValue
+from replay_unpack.core.entity_def.data_types import (
+    Array,
+    FixedDict,
+    Float32,
+    Int32,
+    String,
+    UInt8,
+    Vector3,
+)
+from replay_unpack.core.entity_def.definitions import Definitions
+from replay_unpack.core.network.player import PlayerBase
+from replay_unpack.core.subscriptions import Subscriptions
+from replay_unpack.payload_cache import PayloadCache
+from replay_unpack.utils import (
+    MINIMAP_PACK_PATTERN,
+    unpack_minimap_values,
+    unpack_values,
+)
+from replay_unpack.replay_reader import (
+    ReplayReader,
+    map_replay,
+    WOWS_BLOWFISH_KEY,
+    WOWS_REPLAY,
+)
+
+
+def _read_encrypted_payload(path):
+    with open(path, "rb") as f:
+        f.read(4)
+        (blocks_count,) = struct.unpack("i", f.read(4))
+        for _ in range(blocks_count):
+            (block_size,) = struct.unpack("i", f.read(4))
+            f.read(block_size)
+        return f.read()
+
+
+def _decrypt_block_by_block(dirty_data):
+    blowfish = Blowfish.new(WOWS_BLOWFISH_KEY, Blowfish.MODE_ECB)
+    previous_block = None
+    result = []
+    for index in range(8, len(dirty_data), 8):
+        (block,) = struct.unpack("q", blowfish.decrypt(dirty_data[index:index + 8]))
+        if previous_block:
+            block ^= previous_block
+        previous_block = block
+        result.append(struct.pack("q", block))
+    return b"".join(result)
+
+
+@pytest.mark.parametrize(
+    "file",
+    [
+        "replays/116.wowsreplay",
+        "replays/144.wowsreplay",
+    ],
+)
+def test_decrypt_data(file):
+    reader = ReplayReader(file)
+    dirty_data = _read_encrypted_payload(file)
+
+    # noinspection PyUnresolvedReferences
+    assert reader._ReplayReader__decrypt_data(
+        dirty_data
+    ) == _decrypt_block_by_block(dirty_data)
+    assert reader._type == WOWS_REPLAY
+
+
+def test_stream_decompressed_data():
+    with open("replays/144.wowsreplay", "rb") as f:
+        full = CustomReader(f).get_replay_data().decrypted_data
+    with open("replays/144.wowsreplay", "rb") as f:
+        streamed = CustomReader(f).get_replay_data(stream=True).decrypted_data
+        streamed = b"".join(streamed)
+
+    assert streamed == full
+
+
+def test_map_replay():
+    path = "replays/144.wowsreplay"
+    with open(path, "rb") as f:
+        expected = f.read()
+        f.seek(4)
+        assert map_replay(f) == expected[4:]
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    assert map_replay(data) == expected
+    from_mmap = CustomReader(data).get_replay_data().decrypted_data
+    assert map_replay(path) == expected
+    assert map_replay(BytesIO(expected)) == expected
+
+    assert CustomReader(path).get_replay_data().decrypted_data == from_mmap
+    assert ReplayReader(data).probe() == ReplayReader(path).probe()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_dump_binary(tmp_path, monkeypatch, stream):
+    path = os.path.abspath("replays/144.wowsreplay")
+    monkeypatch.chdir(tmp_path)
+    with open(path, "rb") as f:
+        data = CustomReader(f, dump_binary=True).get_replay_data(stream).decrypted_data
+        if stream:
+            data = b"".join(data)
+    assert (tmp_path / "144.wowsreplay.hex").read_bytes() == data
+
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as replay:
+            CustomReader(replay, dump_binary=True).get_replay_data()
+    assert (tmp_path / "replay.hex").read_bytes() == data
+
+
+def test_payload_cache(tmp_path):
+    cache = PayloadCache(str(tmp_path), max_size=12)
+    assert cache.get("a") is None
+    cache.put("a", b"aaaaaa")
+    assert cache.get("a")[:] == b"aaaaaa"
+
+    # entry is added only if all chunks were consumed
+    chunks = cache.iter_and_put("b", [b"bbb", b"bbb"])
+    assert next(chunks) == b"bbb"
+    chunks.close()
+    assert cache.get("b") is None
+    assert [path.name for path in tmp_path.iterdir()] == ["a.bin"]
+
+    # least recently used entry is evicted
+    cache.put("b", b"bbbbbb")
+    os.utime(tmp_path / "a.bin", (1, 1))
+    os.utime(tmp_path / "b.bin", (2, 2))
+    cache.get("a")
+    cache.put("c", b"cccccc")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.bin", "c.bin"]
+
+
+def test_payload_cache_is_closed(tmp_path):
+    cache = PayloadCache(str(tmp_path))
+    mapped = []
+    get = cache.get
+    cache.get = lambda key: mapped.append(get(key)) or mapped[-1]
+    for _ in range(2):
+        with open("replays/144.wowsreplay", "rb") as f:
+            ReplayParser(f, channels=["evt_score"], cache=cache).get_info()
+    assert mapped[0] is None and mapped[1].closed
+
+
+def test_probe():
+    (path, info), = probe_replays(["replays/144.wowsreplay"])
+
+    with open(path, "rb") as f:
+        parser = ReplayParser(f)
+        assert parser.probe() == info
+        hidden = parser.get_info()["hidden"]
+
+    assert info["error"] is None
+    assert info["is_supported"]
+    assert info["map"] == hidden["map"]
+    assert info["arena_id"] == hidden["arena_id"]
+
+
+def test_trace_sink():
+    events = []
+    with open("replays/144.wowsreplay", "rb") as f:
+        ReplayParser(f, strict=True, trace_sink=events.append).get_info()
+
+    assert events and all(event.duration >= 0 for event in events)
+    assert any(event.packet == "Map" for event in events)
+    methods = {
+        (event.entity, event.member) for event in events if event.packet == "EntityMethod"
+    }
+    assert ("Avatar", "onArenaStateReceived") in methods
+    # method calls without subscribers are skipped, but still described
+    skipped = [event for event in events if event.skipped]
+    assert skipped and all(
+        event.packet == "EntityMethod" and event.entity and event.member
+        for event in skipped
+    )
+    assert ("Avatar", "onCheckGamePing") in {
+        (event.entity, event.member) for event in skipped
+    }
+    properties = {
+        (event.entity, event.member) for event in events if event.packet == "EntityProperty"
+    }
+    assert all(entity and member for entity, member in properties)
+
+
+def _fields(obj):
+    if isinstance(obj, memoryview):
+        return bytes(obj)
+    names = getattr(obj, "__slots__", None) or getattr(obj, "__dict__", None)
+    if names is None:
+        return obj
+    return {name: _fields(getattr(obj, name)) for name in names}
+
+
+def test_packets_from_buffer():
+    with open("replays/144.wowsreplay", "rb") as f:
+        data = CustomReader(f).get_replay_data().decrypted_data
+
+    for packet in PlayerBase._iter_packets(data):
+        packet_class = PACKETS_MAPPING_12_6_0.get(packet.type)
+        if not hasattr(packet_class, "from_buffer"):
+            continue
+        from_buffer = packet_class.from_buffer(
+            packet.buffer, packet.offset, packet.size
+        )
+        from_stream = packet_class(packet.raw_data)
+        assert _fields(from_buffer) == _fields(from_stream)
+
+
+def test_packet_index():
+    with open("replays/144.wowsreplay", "rb") as f:
+        data = CustomReader(f).get_replay_data().decrypted_data
+
+    packets = list(PlayerBase._iter_packets(data))
+    index = PlayerBase.build_index(data)
+
+    assert len(index) == len(packets)
+    assert sum(index.get_counts().values()) == len(packets)
+    assert index.get_counts()[0x8] == sum(p.type == 0x8 for p in packets)
+    assert index[100]["offset"] + 12 == packets[100].offset
+    assert index[100]["time"] == packets[100].time
+
+    position = index.seek(600)
+    assert packets[position].time >= 600
+    assert packets[position - 1].time < 600
+
+
+def test_play_time_window():
+    with open("replays/144.wowsreplay", "rb") as f:
+        parser = ReplayParser(f)
+        replay = parser._reader.get_replay_data()
+    full = parser._get_player(replay)
+    full.play(replay.decrypted_data)
+    full_events = full.get_info()["replay_data"].events
+
+    player = parser._get_player(replay)
+    timeline = player._battle_controller._dict_events
+    record, packet_times = timeline.record, []
+    timeline.record = lambda *args: (
+        packet_times.append(player._battle_controller._packet_time), record(*args)
+    )
+    player.play(replay.decrypted_data, start=600, end=900)
+    events = player.get_info()["replay_data"].events
+
+    assert packet_times and all(600 <= t <= 900 for t in packet_times)
+    *window, last_frame = events
+    assert set(window) <= set(full_events)
+    assert max(window) - min(window) <= 300 and events[last_frame].last_frame
+
+
+def test_definitions_cache(tmp_path):
+    base_dir = f"{BASE_DIR}/versions/14_4_0"
+    parsed = Definitions.load(base_dir, str(tmp_path))
+    # entities are parsed on first request
+    assert list(tmp_path.iterdir()) == []
+    parsed.get_entity_def_by_name("Vehicle")
+    (cache_dir,) = tmp_path.iterdir()
+    assert [path.name for path in cache_dir.iterdir()] == ["Vehicle.pickle"]
+
+    cached = Definitions.load(base_dir, str(tmp_path))
+    assert cached.get_entity_def_by_index(2) is cached.get_entity_def_by_name("Vehicle")
+    for name in ("Avatar", "Vehicle", "BattleLogic"):
+        parsed_def = parsed.get_entity_def_by_name(name)
+        cached_def = cached.get_entity_def_by_name(name)
+        assert cached_def is not parsed_def
+        assert repr(cached_def.client().get_exposed_index_map()) == repr(
+            parsed_def.client().get_exposed_index_map()
+        )
+        assert repr(cached_def.properties()._internal_index) == repr(
+            parsed_def.properties()._internal_index
+        )
+    with pytest.raises(KeyError):
+        cached.get_entity_def_by_name("Unknown")
+
+
+def test_compiled_decoder():
+    data_type = Array(
+        FixedDict(
+            OrderedDict(
+                id=Int32(),
+                position=Vector3(),
+                flag=UInt8(),
+                name=String(),
+                values=Array(Float32()),
+                speed=Float32(),
+            ),
+            allow_none=True,
+        )
+    )
+    element = (
+        b"\x01"
+        + struct.pack("=i3fB", 7, 1.0, 2.0, 3.0, 1)
+        + b"\x04name"
+        + b"\x02" + struct.pack("2f", 0.5, 1.5)
+        + struct.pack("f", 10.0)
+    )
+    data = b"\x03" + element + b"\x00" + element + b"tail"
+
+    stream = BytesIO(data)
+    value = data_type.create_from_stream(stream)
+    # element by element decoding of array itself
+    expected = data_type._get_value_from_stream(BytesIO(data), 1)
+
+    assert value == expected
+    assert value[1] is None
+    assert value[0] == {
+        "id": 7,
+        "position": (1.0, 2.0, 3.0),
+        "flag": 1,
+        "name": "name",
+        "values": [0.5, 1.5],
+        "speed": 10.0,
+    }
+    assert stream.read() == b"tail"
+
+
+def test_lazy_properties():
+    entity = Entity(1, get_definitions("14_4_0").get_entity_def_by_name("Vehicle"))
+    names = [prop.get_name() for prop in entity.client_properties]
+    index = names.index("serverSpeedRaw")
+
+    payload = BytesIO(struct.pack("H", 42) + b"rest")
+    entity.set_client_property(index, payload)
+    assert payload.read() == b"rest"
+
+    client = entity.properties["client"]
+    assert isinstance(dict.__getitem__(client, "serverSpeedRaw"), LazyValue)
+    assert client["serverSpeedRaw"] == 42
+    assert dict.__getitem__(client, "serverSpeedRaw") == 42
+    assert dict(client.items()) == {"serverSpeedRaw": 42}
+
+
+def test_subscriptions():
+    spec = get_definitions("14_4_0").get_entity_def_by_name("Vehicle")
+    names = [method.get_name() for method in spec.client().get_exposed_index_map()]
+    index = names.index("setConsumables")
+    calls = []
+
+    first, second = Subscriptions(), Subscriptions()
+    first.subscribe_method_call("Vehicle", "setConsumables", calls.append)
+    first.subscribe_method_call("Vehicle", "setConsumables", calls.append)
+
+    assert index in Entity(1, spec, first).get_subscribed_methods()
+    entity = Entity(2, spec, second)
+    assert entity.get_subscribed_methods() == set()
+    # subscribed after entity creation
+    second.subscribe_method_call("Vehicle", "setConsumables", calls.append)
+    assert entity.get_subscribed_methods() == {index}
+    assert first.get_method_table("Vehicle", ())[index] == [calls.append]
+
+
+def test_nested_property_subscriptions():
+    subscriptions = Subscriptions()
+    calls = []
+    subscriptions.subscribe_nested_property_change(
+        "BattleLogic", "state.missions.teamsScore", lambda *args: calls.append("score")
+    )
+    subscriptions.subscribe_nested_property_change(
+        "BattleLogic", "state", lambda *args: calls.append("state")
+    )
+
+    def changed(entity_name, *prop_path):
+        calls.clear()
+        for func in subscriptions.iter_nested_property_subscriptions(entity_name, list(prop_path)):
+            func(None, None)
+        return calls
+
+    assert changed("BattleLogic", "state", "missions", "teamsScore", 0, "score") == ["state", "score"]
+    assert changed("BattleLogic", "state", "missions", "teamsScore") == ["state", "score"]
+    assert changed("BattleLogic", "state", "missions") == ["state"]
+    assert changed("BattleLogic", "stateX", "missions") == []
+    assert changed("Vehicle", "state", "missions", "teamsScore") == []
+
+
+def test_entity_volatiles():
+    definitions = get_definitions("14_4_0")
+    spec = definitions.get_entity_def_by_name("Vehicle")
+    first, second = Entity(1, spec), Entity(2, spec)
+    assert first.client_properties is second.client_properties
+
+    first.set_volatiles((1.0, 2.0, 3.0), 0.1, 0.2, 0.3)
+    assert first.position == (1.0, 2.0, 3.0)
+    assert first.volatiles == {"position": (1.0, 2.0, 3.0), "yaw": 0.1, "pitch": 0.2, "roll": 0.3}
+    assert second.position == (0, 0, 0)
+
+    logic = Entity(3, definitions.get_entity_def_by_name("BattleLogic"))
+    with pytest.raises(RuntimeError):
+        logic.position
+    logic.position = (1.0, 2.0, 3.0)
+    assert logic.volatiles == {"position": (1.0, 2.0, 3.0)}
+
+
+def test_fixed_dict_mapping():
+    data_type = FixedDict(OrderedDict(id=Int32(), position=Vector3(), flag=UInt8()))
+    value = data_type.create_from_stream(BytesIO(struct.pack("=i3fB", 7, 1.0, 2.0, 3.0, 1)))
+
+    assert value == {"id": 7, "position": (1.0, 2.0, 3.0), "flag": 1}
+    assert list(value.items()) == [("id", 7), ("position", (1.0, 2.0, 3.0)), ("flag", 1)]
+    assert value.get_field_name_for_index(2) == "flag"
+    assert value.get_field_type_for_index(0) is data_type.attributes["id"]
+
+    value["flag"] = 0
+    del value["id"]
+    assert dict(value) == {"position": (1.0, 2.0, 3.0), "flag": 0}
+    assert value.get("id", 0) == 0 and "id" not in value
+    with pytest.raises(KeyError):
+        value["unknown"] = 1
+
+    assert copy.deepcopy(value) == value
+    restored = pickle.loads(pickle.dumps(value))
+    assert restored == value and restored._schema.names == ("id", "position", "flag")
+
+
+def test_fixed_size_array():
+    info = FixedDict(OrderedDict(position=Vector3(), speed=Float32()))
+    data_type = Array(FixedDict(OrderedDict(id=Int32(), info=info, flag=UInt8())))
+    assert data_type.type.get_row_decoder()[0] == "iffffB"
+
+    element = struct.pack("=i3ffB", 7, 1.0, 2.0, 3.0, 10.0, 1)
+    data = b"\x02" + element + element + b"tail"
+
+    stream = BytesIO(data)
+    value = data_type.create_from_stream(stream)
+    assert stream.read() == b"tail"
+    assert value == [{"id": 7, "info": {"position": (1.0, 2.0, 3.0), "speed": 10.0}, "flag": 1}] * 2
+    assert value[1]["info"].get_field_name_for_index(1) == "speed"
+    assert value.get_element_type() is data_type.type
+
+    vectors = Array(Vector3()).create_from_stream(BytesIO(b"\x01" + element[4:16]))
+    assert vectors == [(1.0, 2.0, 3.0)]
+
+
+def test_event_timeline():
+    timeline = EventTimeline()
+    timeline.KEYFRAME_INTERVAL = 3
+    state = {name: {} for name in EventTimeline.STATE_FIELDS}
+    shots, expected = [], {}
+    for time in [0, 1, 2, 3, 4, 5, 6, 6, 7]:
+        state["evt_vehicle"][time % 3] = (time, time // 2)
+        if time == 4:
+            # moved to the end of dict
+            del state["evt_vehicle"][0]
+            state["evt_vehicle"][0] = (4, 2)
+        state["evt_damage_maps"].setdefault(time % 2, {})[time] = (time, 1.0)
+        state["evt_ribbon"].pop(time - 2, None)
+        state["evt_ribbon"][time] = {}
+        if time % 2:
+            shots.append(time)
+        events = Events(
+            time_left=100 - time,
+            evt_shot=shots,
+            evt_torpedo={},
+            evt_hits=[],
+            evt_consumable={},
+            evt_frag=[],
+            evt_times_to_win=None,
+            evt_chat=[],
+            evt_acoustic_torpedo={},
+            **state,
+        )
+        timeline.record(time, events)
+        expected[time] = copy.deepcopy(events)
+        shots.clear()
+
+    assert list(timeline) == list(expected) and 6 in timeline
+    for time in [7, 2, 5, 6, 0, 3, 4, 1, 2]:
+        assert timeline[time] == expected[time]
+        assert [list(value) for value in timeline[time] if isinstance(value, dict)] == [
+            list(value) for value in expected[time] if isinstance(value, dict)
+        ]
+    assert timeline[3] is timeline[3]
+    restored = pickle.loads(pickle.dumps(timeline))
+    assert dict(restored.items()) == expected
+
+
+def test_vehicle_tracks():
+    with open("replays/144.wowsreplay", "rb") as f:
+        replay_data = ReplayParser(f).get_info()["hidden"]["replay_data"]
+    tracks = replay_data.vehicle_tracks
+
+    assert list(tracks.times) == list(replay_data.events)
+    assert tracks["x"].shape == (len(replay_data.events), len(tracks.columns))
+    for battle_time in list(replay_data.events)[::50]:
+        row = tracks.get_row(battle_time)
+        for vehicle in replay_data.events[battle_time].evt_vehicle.values():
+            column = tracks.columns[vehicle.vehicle_id]
+            for name in ("x", "y", "yaw", "health", "is_alive", "visibility_flag"):
+                assert tracks[name][row, column] == getattr(vehicle, name)
+
+    restored = pickle.loads(pickle.dumps(tracks))
+    assert (restored["health"] == tracks["health"]).all()
+
+
+def test_vehicle_tracks_growth():
+    tracks = VehicleTracks()
+    vehicles = {}
+    buffers = set()
+    # vehicle joins at every tick, like bots of scenarios
+    for battle_time in range(200):
+        vehicles[battle_time] = Vehicle(
+            0, battle_time, 100, True, battle_time, 0, 0.0, 0, True, False, 0, 0, {}
+        )
+        tracks.record(battle_time, vehicles)
+        buffers.add(id(tracks._buffer))
+
+    assert len(buffers) <= 8
+    assert tracks["x"].shape == (200, 200)
+    assert list(tracks["x"][-1]) == list(range(200))
+
+
+def test_unpack_minimap_values():
+    for code in range(2048):
+        packed_value = code | (2047 - code) << 11 | (code % 256) << 22
+        x, y, yaw = unpack_values(packed_value, MINIMAP_PACK_PATTERN)
+        assert unpack_minimap_values(packed_value) == (
+            round(x),
+            round(y),
+            round(math.degrees(yaw)),
+        )
+
+
+def test_event_channels():
+    subscriptions = Subscriptions()
+    handler = lambda *args: None
+    subscriptions.subscribe_method_call("Vehicle", "setConsumables", handler)
+    subscriptions.subscribe_nested_property_change("BattleLogic", "state.missions", handler)
+    subscriptions.unsubscribe(handler)
+    assert subscriptions._methods[("Vehicle", "setConsumables")] == []
+    assert not subscriptions.get_nested_property_tree("BattleLogic").children
+
+    with pytest.raises(ValueError):
+        EventTimeline(["evt_unknown"])
+
+    with open("replays/144.wowsreplay", "rb") as f:
+        parser = ReplayParser(f, channels=["evt_score"])
+        replay_data = parser.get_info()["hidden"]["replay_data"]
+    assert any(events.evt_score for events in replay_data.events.values())
+    assert replay_data.vehicle_tracks is None
+    assert not any(
+        events.evt_vehicle or events.evt_shot or events.evt_times_to_win
+        for events in replay_data.events.values()
+    )
+
+
+def test_event_stream():
+    with open("replays/116.wowsreplay", "rb") as f:
+        parser = ReplayParser(f, channels=["evt_score"])
+        expected = parser.get_info()["hidden"]["replay_data"]
+    with open("replays/116.wowsreplay", "rb") as f:
+        replay_data = ReplayParser(f, channels=["evt_score"]).stream(maxsize=2)
+        assert isinstance(replay_data.events, EventStream)
+        # players are known at first tick, their builds only once spotted
+        assert replay_data.player_info.keys() == expected.player_info.keys()
+        assert replay_data.events.result is None
+        streamed = {time: replay_data.events[time] for time in replay_data.events}
+
+    assert list(streamed) == list(expected.events)
+    assert streamed == dict(expected.events.items())
+    assert streamed[list(streamed)[-1]].last_frame
+    assert replay_data.events.result.game_result == expected.game_result
+    assert replay_data.events.result.player_info == expected.player_info
+    assert list(replay_data.events) == []
+
+
+def test_event_stream_builds():
+    channels = Renderer.get_channels(logs=False, enable_chat=False)
+    with open("replays/1211.wowsreplay", "rb") as f:
+        parser = ReplayParser(f, channels=channels)
+        expected = Renderer(parser.get_info()["hidden"]["replay_data"])
+    with open("replays/1211.wowsreplay", "rb") as f:
+        renderer = Renderer(ReplayParser(f, channels=channels).stream())
+
+    with pytest.raises(RuntimeError):
+        renderer.get_player_build()
+    for _ in renderer.replay_data.events:
+        pass
+    assert renderer.get_player_build() == expected.get_player_build()
+
+
+def _get_producers() -> set[threading.Thread]:
+    return {t for t in threading.enumerate() if "_produce_events" in t.name}
+
+
+@pytest.mark.parametrize("close", [False, True])
+def test_event_stream_abandoned(close):
+    running = _get_producers()
+    with open("replays/130.wowsreplay", "rb") as f:
+        replay_data = ReplayParser(f, channels=["evt_score"]).stream(maxsize=2)
+    (producer,) = _get_producers() - running
+
+    next(iter(replay_data.events))
+    if close:
+        replay_data.events.close()
+        assert list(replay_data.events) == []
+    # consumer drops stream, so parser stops waiting for room in queue
+    del replay_data
+    producer.join(timeout=10)
+    assert not producer.is_alive()